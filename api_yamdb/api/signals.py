@@ -0,0 +1,118 @@
+"""
+Signal handlers bumping the versions of cache scopes when the
+underlying data changes: titles for title lists, titles:<id>,
+reviews:<title_id>, categories and genres for title details,
+users for the user endpoints and usernames for reviews and comments.
+"""
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from reviews.models import Category, Comment, Genre, Review, Title, TitleGenre
+from reviews.versions import bump_version
+from users.cache import user_cache
+from users.models import CustomUser
+
+# Saves that do not change any API representation of a user
+SILENT_USER_FIELDS = frozenset({'last_login'})
+
+
+def titles_changed(pks):
+    bump_version('titles')
+    for pk in set(pks):
+        bump_version(f'titles:{pk}')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    titles_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    """Stop answering 304 for reviews of a deleted title."""
+    bump_version(f'reviews:{instance.pk}')
+
+
+@receiver(post_save, sender=TitleGenre)
+@receiver(post_delete, sender=TitleGenre)
+def title_genre_changed(sender, instance, **kwargs):
+    if instance.title_id is not None:
+        titles_changed([instance.title_id])
+
+
+@receiver(m2m_changed, sender=TitleGenre)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Bump titles whose genres were set, added, removed or cleared."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        titles_changed([instance.pk])
+    elif pk_set:
+        titles_changed(pk_set)
+    else:
+        # A genre lost all its titles: every title detail shows genres
+        bump_version('genres')
+        bump_version('titles')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def category_or_genre_changed(sender, instance, **kwargs):
+    """Bump the scope, which title details and lists depend on."""
+    bump_version('categories' if sender is Category else 'genres')
+    bump_version('titles')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Bump the reviews of the title, its rating is stale too."""
+    bump_version(f'reviews:{instance.title_id}')
+    bump_version('titles')
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Stop answering 304 for comments of a deleted review."""
+    bump_version(f'comments:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump_version(f'comments:{instance.review_id}')
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_username(sender, instance, **kwargs):
+    """Remember the loaded username to notice renames on save."""
+    instance._saved_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Drop the cached user, whatever saved it, and bump users for the
+    user endpoints. Reviews and comments only show usernames: bump
+    usernames on a rename, a new user has nothing to show yet.
+    """
+    user_cache.invalidate(instance.pk)
+    if update_fields and SILENT_USER_FIELDS.issuperset(update_fields):
+        return
+    bump_version('users')
+    renamed = instance._saved_username != instance.username
+    instance._saved_username = instance.username
+    if renamed and not created:
+        bump_version('usernames')
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    bump_version('users')
+    bump_version('usernames')
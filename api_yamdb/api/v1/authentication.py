@@ -0,0 +1,81 @@
+"""
+Stateless JWT authentication
+
+Tokens issued by CustomUserRefreshToken carry the user role and
+superuser flag, so read-only requests are authenticated from the
+token alone instead of loading the user row.
+
+Requests that need the user row get it through the in-process
+users.cache.user_cache.
+"""
+from functools import partial
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.cache import user_cache
+from users.models import CustomUser
+
+USER_CLAIMS = ('username', 'role', 'is_superuser')
+
+
+class CustomUserRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the USER_CLAIMS."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class CustomTokenUser(TokenUser):
+    """Token backed user with the role checks of CustomUser."""
+
+    @property
+    def role(self):
+        return self.token['role']
+
+    @property
+    def is_admin_or_super_user(self):
+        return self.role == CustomUser.ADMIN or self.is_superuser
+
+    @property
+    def is_moderator(self):
+        return self.role == CustomUser.MODERATOR
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication loading users through the user_cache."""
+
+    def get_user(self, validated_token):
+        return user_cache.get(
+            validated_token.get(api_settings.USER_ID_CLAIM),
+            partial(super().get_user, validated_token),
+        )
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """
+    Authenticate safe requests with a CustomTokenUser built from
+    the token claims. Unsafe requests, which may store the user or
+    compare it with an author, and tokens without the claims load
+    the user through the user_cache.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if (request.method in SAFE_METHODS
+                and all(claim in validated_token for claim in USER_CLAIMS)):
+            return CustomTokenUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,70 @@
+"""
+API response caching
+
+Cache keys carry the database versions of the scopes the response
+depends on (see reviews.versions), so a bump by any process or
+command makes every cached entry of the scope unreachable at once,
+whatever query strings it was stored for. Signal handlers in
+api.signals bump the scopes whenever their data changes.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+
+from reviews.versions import versions_tag
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+class CacheStats:
+    """Thread safe hit and miss counters per namespace."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def hit(self, namespace):
+        with self.lock:
+            self.hits[namespace] += 1
+
+    def miss(self, namespace):
+        with self.lock:
+            self.misses[namespace] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                namespace: {
+                    'hits': self.hits[namespace],
+                    'misses': self.misses[namespace],
+                }
+                for namespace in self.hits.keys() | self.misses.keys()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.hits.clear()
+            self.misses.clear()
+
+
+cache_stats = CacheStats()
+
+
+def list_cache_key(namespace, request, versions):
+    """Cache key of a list response for the request query string."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return (
+        f'api:{namespace}:{versions_tag(versions)}:'
+        f'{request.get_host()}:{query}'
+    )
+
+
+def detail_cache_key(namespace, pk, versions):
+    """Cache key of a detail response of the object pk."""
+    return f'api:{namespace}:detail:{pk}:{versions_tag(versions)}'
@@ -1,6 +1,7 @@
 import django_filters
 
 from reviews.models import Title
+from reviews.search import get_search_backend
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -19,7 +20,12 @@ class TitleFilter(django_filters.FilterSet):
     year = django_filters.NumberFilter(
         field_name='year',
     )
+    q = django_filters.CharFilter(method='search')
 
     class Meta:
         model = Title
-        fields = ('name', 'year', 'category', 'genre')
+        fields = ('name', 'year', 'category', 'genre', 'q')
+
+    def search(self, queryset, name, value):
+        """Full-text search in names and descriptions, ranked."""
+        return get_search_backend(queryset.db).search(queryset, value)
@@ -1,4 +1,14 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from reviews.versions import get_versions, last_modified, versions_tag
+from .cache import cache_stats, detail_cache_key, get_cache, list_cache_key
 
 
 class ModelMixinViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
@@ -6,3 +16,135 @@ class ModelMixinViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     """Custom viewset for genres and categories"""
 
     pass
+
+
+def view_versions(view, scopes):
+    """Versions of the scopes, loaded once per request."""
+    loaded = view.__dict__.setdefault('_scope_versions', {})
+    scopes = tuple(scopes)
+    if scopes not in loaded:
+        loaded[scopes] = get_versions(scopes)
+    return loaded[scopes]
+
+
+class NotModified(Exception):
+    """Stops a conditional GET before the handler runs."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GET requests from the database versions of the
+    scopes the response depends on: unchanged resources return 304
+    after a single query and before any serialization, other GET
+    responses carry ETag and Last-Modified headers.
+    """
+    cache_namespace = None
+
+    def get_cache_scopes(self):
+        return (self.cache_namespace,)
+
+    def get_validators(self, request):
+        versions = view_versions(self, self.get_cache_scopes())
+        tag = md5(
+            f'{versions_tag(versions)};{request.get_full_path()};'
+            f'{request.user.pk};{request.accepted_media_type}'.encode()
+        ).hexdigest()
+        return quote_etag(tag), last_modified(versions)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        self.validators = etag, modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            response = exc.response
+            self.set_validators(response)
+            return response
+        return super().handle_exception(exc)
+
+    def set_validators(self, response):
+        if getattr(self, 'validators', None) is None:
+            return
+        etag, modified = self.validators
+        response['ETag'] = etag
+        if modified is not None:
+            response['Last-Modified'] = http_date(modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if response.status_code == 200:
+            self.set_validators(response)
+        return response
+
+
+class CachedListMixin:
+    """
+    Cache list responses per query string in the cache_namespace,
+    dropped together when a signal handler bumps its version.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = list_cache_key(
+            self.cache_namespace, request,
+            view_versions(self, (self.cache_namespace,)))
+        data = cache.get(key)
+        if data is not None:
+            cache_stats.hit(self.cache_namespace)
+            return Response(data)
+        cache_stats.miss(self.cache_namespace)
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data,
+                  getattr(settings, 'API_CACHE_TIMEOUT', 300))
+        return response
+
+
+class CachedRetrieveMixin:
+    """
+    Cache detail responses by primary key and the versions of the
+    get_detail_scopes(pk), so a bump of any of them by a signal
+    handler makes the entry unreachable.
+    """
+    cache_namespace = None
+
+    def get_detail_pk(self):
+        """The primary key in the URL as stored, None if invalid."""
+        value = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            return self.queryset.model._meta.pk.to_python(value)
+        except ValidationError:
+            return None
+
+    def get_detail_scopes(self, pk):
+        return (f'{self.cache_namespace}:{pk}',)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.get_detail_pk()
+        if pk is None:
+            return super().retrieve(request, *args, **kwargs)
+        cache = get_cache()
+        key = detail_cache_key(
+            self.cache_namespace, pk,
+            view_versions(self, self.get_detail_scopes(pk)))
+        data = cache.get(key)
+        if data is not None:
+            cache_stats.hit(self.cache_namespace)
+            return Response(data)
+        cache_stats.miss(self.cache_namespace)
+        response = super().retrieve(request, *args, **kwargs)
+        cache.set(key, response.data,
+                  getattr(settings, 'API_CACHE_TIMEOUT', 300))
+        return response
@@ -0,0 +1,107 @@
+"""API pagination classes"""
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.pagination import (CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Keyset pagination over (pub_date, id), newest first."""
+
+    ordering = ('-pub_date', '-id')
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """
+    Page number pagination that switches to keyset pagination
+    when the client passes the `cursor` query parameter.
+
+    Start with `?cursor=` and follow the `next` links: every page
+    costs the same as the first one, without COUNT(*) and OFFSET.
+    """
+    cursor_pagination_class = PubDateCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+
+class OptionalCountLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with a cheaper count.
+
+    `?count=false` skips COUNT(*) entirely: the page is fetched as
+    limit + 1 rows and the extra row only decides whether there is a
+    `next` link. Otherwise the count may be cached for
+    PAGINATION_COUNT_CACHE_TIMEOUT seconds (0 keeps it exact).
+    """
+    count_query_param = 'count'
+    count_cache_prefix = 'pagination-count'
+
+    def count_requested(self, request):
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() not in ('false', '0', 'no')
+
+    def get_count(self, queryset):
+        timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().get_count(queryset)
+        query = str(queryset.query).encode()
+        key = f'{self.count_cache_prefix}:{md5(query).hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            cache.set(key, count, timeout)
+        return count
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.count_requested(request):
+            return super().paginate_queryset(queryset, request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = None
+        self.offset = self.get_offset(request)
+        self.request = request
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if self.count is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        if self.count is not None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
@@ -0,0 +1,32 @@
+"""API renderers for data export"""
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class CSVRenderer(BaseRenderer):
+    """Renders export errors as csv, exports are streamed by the view."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(data))
+        writer.writeheader()
+        writer.writerow(data)
+        return buffer.getvalue()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders export errors as ndjson, exports are streamed by the view."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False) + '\n'
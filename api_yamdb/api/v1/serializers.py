@@ -2,13 +2,13 @@
 API serializers
 """
 from django.core.exceptions import ValidationError
-from django.shortcuts import get_object_or_404
 from django.http import Http404
 from rest_framework import serializers
 
 from reviews.models import Category, Genre, Title, Comment, Review
 from users.models import CustomUser
-from .validators import validate_data
+from users.tokens import check_confirmation_code
+from .validators import validate_data, validate_username
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -25,8 +25,7 @@ class ReviewSerializer(serializers.ModelSerializer):
     def validate(self, data):
         request = self.context['request']
         author = request.user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
+        title = self.context['title']
         if (
             request.method == 'POST'
             and Review.objects.filter(title=title, author=author).exists()
@@ -43,10 +42,7 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 class CommentSerializer(serializers.ModelSerializer):
     """Serializer for comments."""
-    review = serializers.SlugRelatedField(
-        slug_field='text',
-        read_only=True
-    )
+    review = serializers.PrimaryKeyRelatedField(read_only=True)
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
@@ -112,7 +108,25 @@ class CustomUserSignupSerializer(serializers.Serializer):
     username = serializers.CharField(max_length=150)
 
     def validate(self, data):
-        return validate_data(data)
+        """
+        Check username and email conflicts in one query
+        and pass the existing user, if any, as data['user']
+        """
+        validate_username(data['username'])
+        users = CustomUser.objects.by_username_or_email(
+            data['username'], data['email'])
+        data['user'] = None
+        conflict = None
+        for user in users:
+            if user.username_match and user.email_match:
+                data['user'] = user
+            elif user.email_match:
+                conflict = 'This email is taken'
+            elif conflict is None:
+                conflict = 'This username is taken'
+        if conflict:
+            raise serializers.ValidationError(conflict)
+        return data
 
 
 class CustomUserTokenSerializer(serializers.Serializer):
@@ -123,14 +137,17 @@ class CustomUserTokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(max_length=64, required=True)
 
     def validate(self, data):
-        if not CustomUser.objects.filter(
-                username__iexact=data['username']).exists():
+        """
+        Load the user in one query
+        and pass it on as data['user']
+        """
+        user = CustomUser.objects.by_username(data['username']).first()
+        if user is None:
             raise Http404('User not found')
 
-        if (CustomUser.objects
-                .get(username__iexact=data['username'])
-                .confirmation_code != data.get('confirmation_code')):
+        if not check_confirmation_code(user, data['confirmation_code']):
             raise serializers.ValidationError('Check confirmation code')
+        data['user'] = user
         return data
 
 
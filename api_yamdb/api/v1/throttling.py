@@ -0,0 +1,185 @@
+"""
+Sliding window rate throttling
+
+Every key keeps the hit counts of the current and the previous fixed
+window. The previous count is weighted by how much of it the sliding
+window still covers, which approximates a true sliding log with two
+integers per key. Counters live in the store named by the
+THROTTLE_COUNTER_STORE setting, in process memory by default.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'10/minute' -> (10, 60)"""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+def estimate_wait(limit, period, now, current, previous):
+    """Seconds until the sliding window count drops below limit."""
+    elapsed = now / period % 1
+    if current >= limit or not previous:
+        return (1 - elapsed) * period
+    return max((1 - (limit - current) / previous - elapsed) * period, 0.001)
+
+
+class BaseCounterStore:
+    """Interface of the throttle counter stores."""
+
+    def hit(self, key, limit, period, now):
+        """
+        Count a hit of key unless it exceeds limit hits per period.
+        Return 0 if the hit is allowed, else the seconds to wait.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Forget all counters."""
+        raise NotImplementedError
+
+
+class LocMemCounterStore(BaseCounterStore):
+    """
+    Counters in process memory, grouped in a bucket of keys per period
+    and window. Windows older than the previous one are dropped whole
+    and above max_keys counters the oldest ones are evicted, so a
+    flood of new keys costs O(1) per hit and bounded memory.
+    """
+
+    max_keys = 100000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.size = 0
+
+    def get_bucket(self, period, window):
+        """The bucket of the window, created on first use, lock held."""
+        bucket = self.buckets.get((period, window))
+        if bucket is None:
+            stale = [
+                name for name in self.buckets
+                if name[0] == period and name[1] < window - 1
+            ]
+            for name in stale:
+                self.size -= len(self.buckets.pop(name))
+            bucket = self.buckets[(period, window)] = OrderedDict()
+        return bucket
+
+    def evict(self):
+        """Drop the oldest counter of the oldest window, lock held."""
+        for name in sorted(self.buckets, key=lambda name: name[0] * name[1]):
+            if self.buckets[name]:
+                self.buckets[name].popitem(last=False)
+                self.size -= 1
+                return
+
+    def hit(self, key, limit, period, now):
+        window = int(now // period)
+        with self.lock:
+            bucket = self.get_bucket(period, window)
+            current = bucket.get(key, 0)
+            previous = self.buckets.get((period, window - 1), {}).get(key, 0)
+            if previous * (1 - now / period % 1) + current >= limit:
+                return estimate_wait(limit, period, now, current, previous)
+            if not current:
+                if self.size >= self.max_keys:
+                    self.evict()
+                self.size += 1
+            bucket[key] = current + 1
+        return 0
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+            self.size = 0
+
+
+class CacheCounterStore(BaseCounterStore):
+    """
+    Counters in the Django cache named by THROTTLE_CACHE_ALIAS,
+    shared by all processes using a shared cache backend.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'THROTTLE_CACHE_ALIAS',
+                                    'default')]
+
+    def hit(self, key, limit, period, now):
+        window = int(now // period)
+        current_key = f'throttle:{key}:{window}'
+        counts = self.cache.get_many(
+            [current_key, f'throttle:{key}:{window - 1}'])
+        current = counts.get(current_key, 0)
+        previous = counts.get(f'throttle:{key}:{window - 1}', 0)
+        if previous * (1 - now / period % 1) + current >= limit:
+            return estimate_wait(limit, period, now, current, previous)
+        if not self.cache.add(current_key, 1, 2 * period):
+            self.cache.incr(current_key)
+        return 0
+
+
+@lru_cache(maxsize=None)
+def load_counter_store(path):
+    return import_string(path)()
+
+
+def get_counter_store():
+    return load_counter_store(getattr(
+        settings, 'THROTTLE_COUNTER_STORE',
+        'api.v1.throttling.LocMemCounterStore'))
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Limit requests per key of the scope to the rate set in
+    DEFAULT_THROTTLE_RATES, counted separately for every path.
+    """
+    scope = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        key = rate and self.get_key(request, view)
+        if not key:
+            return True
+        limit, period = parse_rate(rate)
+        self.wait_seconds = get_counter_store().hit(
+            f'{self.scope}:{request.path}:{key}', limit, period, time.time())
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPRateThrottle(SlidingWindowRateThrottle):
+    """Throttle by client IP address."""
+    scope = 'auth_ip'
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UsernameRateThrottle(SlidingWindowRateThrottle):
+    """Throttle by the username posted in the request body."""
+    scope = 'auth_username'
+
+    def get_key(self, request, view):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        return username.lower() if isinstance(username, str) else None
@@ -1,7 +1,7 @@
 """
 API URLS
 """
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import SimpleRouter
 
 from .views import (CustomUserModelViewSet,
@@ -11,6 +11,7 @@ from .views import (CustomUserModelViewSet,
                     GenreViewSet,
                     TitleViewSet,
                     CommentViewSet,
+                    ExportView,
                     ReviewViewSet)
 
 app_name = 'api'
@@ -39,6 +40,9 @@ v1_auth = [
 v1 = [
     path('auth/', include(v1_auth)),
 
+    re_path(r'^export/(?P<resource>titles|reviews|comments)/$',
+            ExportView.as_view(), name='export'),
+
     path('', include(router_v1.urls)),
 ]
 
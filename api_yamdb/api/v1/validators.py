@@ -3,12 +3,23 @@ API validators
 """
 import re
 
-from django.db.models import Q
+from django.db.models import Value
+from django.db.models.functions import Lower
 from rest_framework import serializers
 
 from users.models import CustomUser
 
 
+def validate_username(username):
+    """
+    Input data validation of username format
+    """
+    if not re.match(r'^[\w.@+-]+\Z', username):
+        raise serializers.ValidationError('Check username')
+    if username.lower() == 'me':
+        raise serializers.ValidationError('Username "me" not allowed')
+
+
 def validate_data(data):
     """
     Input data validation of username and email fields
@@ -18,17 +29,14 @@ def validate_data(data):
 
     if username and email:
 
-        if not re.match(r'^[\w.@+-]+\Z', username):
-            raise serializers.ValidationError('Check username')
-        if username.lower() == 'me':
-            raise serializers.ValidationError('Username "me" not allowed')
+        validate_username(username)
 
-        if (CustomUser.objects.filter(
-                Q(email__iexact=email) & ~Q(username__iexact=username))):
+        if (CustomUser.objects.by_email(email)
+                .exclude(username_lower=Lower(Value(username)))):
             raise serializers.ValidationError('This email is taken')
 
-        if (CustomUser.objects.filter(
-                Q(username__iexact=username) & ~Q(email__iexact=email))):
+        if (CustomUser.objects.by_username(username)
+                .exclude(email_lower=Lower(Value(email)))):
             raise serializers.ValidationError('This username is taken')
 
     return data
@@ -1,26 +1,34 @@
 """
 API views
 """
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import IntegrityError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import (api_view, permission_classes, action,
+                                       throttle_classes)
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.filters import SearchFilter
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.pagination import PageNumberPagination
 
+from reviews.exporting import (csv_lines, export_rows, get_export_spec,
+                               ndjson_lines)
 from reviews.models import Category, Genre, Title, Review
+from users.mail import enqueue_mail
 from users.models import CustomUser
+from users.tokens import make_confirmation_code
+from .authentication import CachedJWTAuthentication, CustomUserRefreshToken
 from .filters import TitleFilter
-from .mixins import ModelMixinViewSet
+from .mixins import (CachedListMixin, CachedRetrieveMixin,
+                     ConditionalGetMixin, ModelMixinViewSet)
+from .pagination import PageNumberOrCursorPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .throttling import IPRateThrottle, UsernameRateThrottle
 from .permissions import (IsAdminUserOrReadOnly,
                           CustomUserIsAdminBasePermission,
                           IsAdminOrModeratorOrAuthor)
@@ -36,9 +44,12 @@ from .serializers import (CategorySerializer,
                           ReviewSerializer)
 
 
-class CategoryViewSet(ModelMixinViewSet):
+class CategoryViewSet(ConditionalGetMixin, CachedListMixin,
+                      ModelMixinViewSet):
     """Viewset for categories."""
 
+    cache_namespace = 'categories'
+
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminUserOrReadOnly]
@@ -47,9 +58,11 @@ class CategoryViewSet(ModelMixinViewSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(ModelMixinViewSet):
+class GenreViewSet(ConditionalGetMixin, CachedListMixin, ModelMixinViewSet):
     """Viewset for genres."""
 
+    cache_namespace = 'genres'
+
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [IsAdminUserOrReadOnly]
@@ -58,46 +71,66 @@ class GenreViewSet(ModelMixinViewSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedRetrieveMixin, ModelViewSet):
     """Viewset for titles"""
 
-    queryset = Title.objects.all()
+    cache_namespace = 'titles'
+
+    queryset = (
+        Title.objects
+        .select_related('category')
+        .prefetch_related('genre')
+    )
     permission_classes = [IsAdminUserOrReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
 
+    def get_detail_scopes(self, pk):
+        return (f'titles:{pk}', f'reviews:{pk}', 'categories', 'genres')
+
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            pk = self.get_detail_pk()
+            if pk is not None:
+                return self.get_detail_scopes(pk)
+        return super().get_cache_scopes()
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleReadSerializer
         return TitleWriteSerializer
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        avg = Review.objects.filter(title=instance).aggregate(Avg('score'))
-        instance.rating = avg['score__avg']
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
-
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вьюсет для обработки отзывов."""
 
     permission_classes = [IsAdminOrModeratorOrAuthor]
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrCursorPagination
     filter_backends = [filters.SearchFilter]
     serializer_class = ReviewSerializer
 
-    def title_query(self):
-        return get_object_or_404(Title, id=self.kwargs.get('title_id'))
+    def get_title(self):
+        """Load the title from the URL once per request."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, id=self.kwargs.get('title_id'))
+        return self._title
+
+    def get_cache_scopes(self):
+        # Reviews show the title name
+        title_id = self.kwargs.get('title_id')
+        return (f'reviews:{title_id}', f'titles:{title_id}', 'usernames')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['title'] = self.get_title()
+        return context
 
     def get_queryset(self):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return self.get_title().reviews.select_related('author')
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.title_query())
+        serializer.save(author=self.request.user, title=self.get_title())
 
 
 class CommentViewSet(ReviewViewSet):
@@ -105,21 +138,36 @@ class CommentViewSet(ReviewViewSet):
 
     serializer_class = CommentSerializer
 
-    def review_query(self):
-        return get_object_or_404(Review, id=self.kwargs.get('review_id'))
+    def get_review(self):
+        """Load the review and its title from the URL in one query."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.select_related('title'),
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'))
+        return self._review
+
+    def get_title(self):
+        return self.get_review().title
+
+    def get_cache_scopes(self):
+        return (f'comments:{self.kwargs.get("review_id")}', 'usernames')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['review'] = self.get_review()
+        return context
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'))
-        return review.comments.all()
+        return self.get_review().comments.select_related('author')
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.review_query())
+        serializer.save(author=self.request.user, review=self.get_review())
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([IPRateThrottle, UsernameRateThrottle])
 def custom_user_signup(request):
     """
     View function for
@@ -130,24 +178,20 @@ def custom_user_signup(request):
     serializer.is_valid(raise_exception=True)
     username = serializer.validated_data.get('username')
     email = serializer.validated_data.get('email')
+    user = serializer.validated_data.get('user')
 
-    user, created = CustomUser.objects.get_or_create(
-        username=username,
-        email=email, )
-
-    if not created:
-        user.confirmation_code = default_token_generator.make_token(user)
-        user.save(update_fields=['confirmation_code'])
-    else:
-        user.confirmation_code = default_token_generator.make_token(user)
-        user.save()
+    if user is None:
+        user = CustomUser(username=username, email=email)
+        try:
+            user.save()
+        except IntegrityError:
+            raise ValidationError('This username or email is taken')
 
-    send_mail(
+    enqueue_mail(
         subject='Your confirmation code for YaMDb',
-        message=f'Your confirmation code: {user.confirmation_code}.',
+        message=f'Your confirmation code: {make_confirmation_code(user)}.',
         from_email='admin@yamdb.ru',
         recipient_list=[email, ],
-        fail_silently=True,
     )
     return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -160,23 +204,21 @@ class CustomUserTokenView(APIView):
     """
     serializer_class = CustomUserTokenSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (IPRateThrottle, UsernameRateThrottle)
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        username = serializer.validated_data.get('username')
 
-        user = CustomUser.objects.get(
-            username=username)
-
-        refresh = RefreshToken.for_user(user)
+        refresh = CustomUserRefreshToken.for_user(
+            serializer.validated_data['user'])
         return Response({
             'access_token': str(refresh.access_token),
             'refresh_token': str(refresh),
         }, status=status.HTTP_200_OK)
 
 
-class CustomUserModelViewSet(viewsets.ModelViewSet):
+class CustomUserModelViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ModelViewSet class for
     getting, posting, updating, deleting
@@ -189,7 +231,10 @@ class CustomUserModelViewSet(viewsets.ModelViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
     lookup_field = 'username'
+    # Roles and profiles must be current: load the user, not the token
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (CustomUserIsAdminBasePermission,)
+    cache_namespace = 'users'
 
     @action(detail=False,
             methods=['get', 'patch'],
@@ -206,3 +251,35 @@ class CustomUserModelViewSet(viewsets.ModelViewSet):
                             role=request.user.role)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ExportView(APIView):
+    """
+    APIView class for
+    streaming all titles, reviews or comments
+    as csv (default) or ndjson (?format=ndjson)
+    """
+    authentication_classes = (CachedJWTAuthentication,)
+    permission_classes = (CustomUserIsAdminBasePermission,)
+    renderer_classes = (CSVRenderer, NDJSONRenderer)
+    exports = {
+        'titles': 'titles',
+        'reviews': 'review',
+        'comments': 'comments',
+    }
+    formatters = {
+        'csv': csv_lines,
+        'ndjson': ndjson_lines,
+    }
+
+    def get(self, request, resource):
+        spec = get_export_spec(self.exports[resource])
+        renderer = request.accepted_renderer
+        lines = self.formatters[renderer.format](spec, export_rows(spec))
+        response = StreamingHttpResponse(
+            lines,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{resource}.{renderer.format}"')
+        return response
@@ -72,6 +72,22 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api_yamdb',
+    }
+}
+
+# Cache used for API responses and how long list responses are kept
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 300
+
+# Cache shared by all processes (Redis, Memcached) holding the data
+# versions of reviews.versions, None to read them from the database
+VERSIONS_CACHE_ALIAS = None
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -118,12 +134,33 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.v1.authentication.StatelessJWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
-    'PAGE_SIZE': 10
+    'DEFAULT_PAGINATION_CLASS': 'api.v1.pagination.OptionalCountLimitOffsetPagination',
+    'PAGE_SIZE': 10,
+    # Signup and token requests per client IP and per posted username
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '60/minute',
+        'auth_username': '10/minute',
+    },
 }
 
+# Where throttles keep their counters: LocMemCounterStore per process
+# or CacheCounterStore in the THROTTLE_CACHE_ALIAS cache
+THROTTLE_COUNTER_STORE = 'api.v1.throttling.LocMemCounterStore'
+
+# Seconds to cache COUNT(*) of paginated lists, 0 keeps counts exact
+PAGINATION_COUNT_CACHE_TIMEOUT = 0
+
+# In-process cache of users loaded by the JWT authentication
+USER_CACHE = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 30,
+}
+
+# Seconds a confirmation code sent on signup stays valid
+CONFIRMATION_CODE_TIMEOUT = 60 * 60 * 24
+
 SIMPLE_JWT = {
     # Устанавливаем срок жизни токена
     'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.MyTokenObtainPairSerializer',
@@ -137,3 +174,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Background delivery of emails stored in users.OutboxEmail
+MAILER = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'CLAIM_TIMEOUT': 300,
+}
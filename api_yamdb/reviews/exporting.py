@@ -0,0 +1,56 @@
+"""Streaming export of data in the layout of the csv import."""
+import csv
+import json
+from datetime import date, datetime
+
+from .importing import IMPORT_SPECS
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object returning what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(spec, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield dicts keyed by csv column for every row of the spec model,
+    fetched in chunks with a server-side cursor where supported.
+    """
+    columns = list(spec.fields)
+    rows = (
+        spec.model.objects
+        .order_by('pk')
+        .values_list(*spec.fields.values())
+        .iterator(chunk_size=chunk_size)
+    )
+    for values in rows:
+        yield {
+            column: value.isoformat()
+            if isinstance(value, (date, datetime)) else value
+            for column, value in zip(columns, values)
+        }
+
+
+def csv_lines(spec, rows):
+    """Yield a csv header and then a line per row."""
+    writer = csv.DictWriter(Echo(), fieldnames=list(spec.fields))
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(spec, rows):
+    """Yield a JSON object per line for every row."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def get_export_spec(name):
+    for spec in IMPORT_SPECS:
+        if spec.name == name:
+            return spec
+    raise LookupError(f'Unknown export {name}')
@@ -0,0 +1,528 @@
+"""Bulk loading of csv data into the database."""
+import gzip
+import hashlib
+import json
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from csv import DictReader
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import (Category, Comment, Genre, ImportCheckpoint,
+                     ImportedRow, Review, Title, TitleGenre)
+from users.models import CustomUser
+
+ImportSpec = namedtuple(
+    'ImportSpec', ('name', 'model', 'fields', 'key'), defaults=('id',))
+ImportResult = namedtuple('ImportResult', ('rows', 'written'))
+
+INSERT, UPSERT, INCREMENTAL = 'insert', 'upsert', 'incremental'
+
+# Files in loading order with csv columns mapped to model attributes
+# and the attribute identifying existing rows in upsert mode.
+IMPORT_SPECS = (
+    ImportSpec('category', Category, {
+        'id': 'id',
+        'name': 'name',
+        'slug': 'slug',
+    }),
+    ImportSpec('genre', Genre, {
+        'id': 'id',
+        'name': 'name',
+        'slug': 'slug',
+    }),
+    ImportSpec('titles', Title, {
+        'id': 'id',
+        'name': 'name',
+        'year': 'year',
+        'category': 'category_id',
+        'description': 'description',
+    }),
+    ImportSpec('genre_title', TitleGenre, {
+        'id': 'id',
+        'title_id': 'title_id',
+        'genre_id': 'genre_id',
+    }),
+    ImportSpec('users', CustomUser, {
+        'id': 'id',
+        'username': 'username',
+        'email': 'email',
+        'role': 'role',
+        'bio': 'bio',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+    }),
+    ImportSpec('review', Review, {
+        'id': 'id',
+        'title_id': 'title_id',
+        'text': 'text',
+        'author': 'author_id',
+        'score': 'score',
+        'pub_date': 'pub_date',
+    }),
+    ImportSpec('comments', Comment, {
+        'id': 'id',
+        'review_id': 'review_id',
+        'text': 'text',
+        'author': 'author_id',
+        'pub_date': 'pub_date',
+    }),
+)
+
+FORMATS = ('csv', 'jsonl')
+
+
+def load_specs(mappings=None):
+    """
+    Import specs with field mappings replaced by mappings,
+    a {spec name: {column: model attribute}} dict.
+    """
+    mappings = mappings or {}
+    unknown = set(mappings) - {spec.name for spec in IMPORT_SPECS}
+    if unknown:
+        raise ValueError(f'Unknown import files: {", ".join(unknown)}')
+    return [
+        spec._replace(fields=mappings[spec.name])
+        if spec.name in mappings else spec
+        for spec in IMPORT_SPECS
+    ]
+
+
+def spec_dependencies(spec, specs=IMPORT_SPECS):
+    """Names of the specs whose models the spec model references."""
+    related = {
+        field.related_model for field in spec.model._meta.concrete_fields
+        if field.many_to_one or field.one_to_one
+    }
+    return {
+        other.name for other in specs
+        if other is not spec and other.model in related
+    }
+
+
+def import_stages(specs=IMPORT_SPECS):
+    """
+    Group specs into stages: every spec only references models
+    loaded by earlier stages, so specs of a stage are independent.
+    """
+    pending = {spec.name: spec_dependencies(spec, specs) for spec in specs}
+    done = set()
+    stages = []
+    while pending:
+        stage = [
+            spec for spec in specs
+            if spec.name in pending and pending[spec.name] <= done
+        ]
+        if not stage:
+            raise ValueError(f'Circular import dependencies: {pending}')
+        for spec in stage:
+            del pending[spec.name]
+            done.add(spec.name)
+        stages.append(stage)
+    return stages
+
+
+def detect_format(path):
+    """Guess the format from the file name, csv by default."""
+    name = path[:-len('.gz')] if path.endswith('.gz') else path
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+@contextmanager
+def open_source(path):
+    """Open a text stream: '-' for stdin, gzip for *.gz files."""
+    if path == '-':
+        yield sys.stdin
+    elif path.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as stream:
+            yield stream
+    else:
+        with open(path, encoding='utf-8', newline='') as stream:
+            yield stream
+
+
+def read_csv(stream):
+    """Yield csv rows as dicts."""
+    yield from DictReader(stream)
+
+
+def read_jsonl(stream):
+    """Yield JSON objects from non-empty lines."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_rows(path, data_format=None):
+    """Yield rows of a source one by one without loading it whole."""
+    reader = read_jsonl if (
+        (data_format or detect_format(path)) == 'jsonl') else read_csv
+    with open_source(path) as stream:
+        yield from reader(stream)
+
+
+def build_objects(spec, rows):
+    """
+    Yield unsaved model instances for csv rows. Empty values of
+    nullable fields are NULL, which csv files cannot tell apart,
+    and so are keys left out of a JSONL line.
+    """
+    meta = spec.model._meta
+    nullable = {
+        attribute for attribute in spec.fields.values()
+        if meta.get_field(attribute).null
+    }
+    for row in rows:
+        values = {}
+        for column, attribute in spec.fields.items():
+            value = row.get(column)
+            if value in (None, ''):
+                value = None if attribute in nullable else ''
+            values[attribute] = value
+        yield spec.model(**values)
+
+
+def present_spec(spec, rows):
+    """The spec limited to the columns present in any of the rows."""
+    fields = {
+        column: attribute for column, attribute in spec.fields.items()
+        if any(column in row for row in rows)
+    }
+    if len(fields) == len(spec.fields):
+        return spec
+    return spec._replace(fields=fields)
+
+
+@contextmanager
+def explicit_dates(spec):
+    """
+    Store the mapped values of auto_now_add fields, like pub_date,
+    instead of the current time and yield those fields.
+    Objects without a value still get the current time.
+    """
+    meta = spec.model._meta
+    fields = [
+        meta.get_field(attribute) for attribute in spec.fields.values()
+        if getattr(meta.get_field(attribute), 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def fill_dates(batch, fields):
+    """Set empty auto_now_add dates of unsaved objects to now."""
+    now = timezone.now()
+    for obj in batch:
+        for field in fields:
+            if getattr(obj, field.attname) in (None, ''):
+                setattr(obj, field.attname, now)
+
+
+def batches(iterable, batch_size):
+    """Split an iterable into lists of batch_size items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_rows(spec, rows, batch_size, mode=INSERT):
+    """
+    Write rows in batches in one transaction. Mapped columns missing
+    from every row of a batch, like description in the sample
+    titles.csv, are left to model defaults and never compared. Mapped dates of
+    auto_now_add fields are stored as they are in the source.
+
+    INSERT adds rows with bulk_create. UPSERT matches rows to
+    existing ones by spec.key: new rows are inserted, changed rows
+    are updated with bulk_update and unchanged ones are skipped.
+    INCREMENTAL upserts only rows whose content hash differs from
+    the one recorded by the previous run.
+    """
+    result = ImportResult(0, 0)
+    with transaction.atomic():
+        for raw_batch in batches(rows, batch_size):
+            read = len(raw_batch)
+            batch_spec = present_spec(spec, raw_batch)
+            if mode == INCREMENTAL:
+                raw_batch, records = changed_rows(batch_spec, raw_batch)
+            with explicit_dates(batch_spec) as dates:
+                batch = list(build_objects(batch_spec, raw_batch))
+                fill_dates(batch, dates)
+                if mode == INSERT:
+                    spec.model.objects.bulk_create(batch)
+                    written = len(batch)
+                else:
+                    written = upsert_batch(batch_spec, batch) if batch else 0
+            if mode == INCREMENTAL:
+                save_digests(*records)
+            result = ImportResult(
+                result.rows + read, result.written + written)
+    return result
+
+
+def upsert_batch(spec, batch):
+    """Insert new and update changed objects, return how many."""
+    meta = spec.model._meta
+    key = meta.get_field(spec.key)
+    fields = [meta.get_field(attribute) for attribute in spec.fields.values()]
+    compared = [
+        field for field in fields
+        if not field.primary_key and field is not key
+    ]
+    for obj in batch:
+        for field in fields:
+            setattr(obj, field.attname,
+                    field.to_python(getattr(obj, field.attname)))
+    existing = {
+        getattr(row, key.attname): row
+        for row in spec.model.objects.filter(**{
+            f'{key.name}__in': [getattr(obj, key.attname) for obj in batch]
+        }).only(*{field.name for field in fields} | {'pk'})
+    }
+    created, changed = [], []
+    for obj in batch:
+        row = existing.get(getattr(obj, key.attname))
+        if row is None:
+            created.append(obj)
+        elif any(getattr(obj, field.attname) != getattr(row, field.attname)
+                 for field in compared):
+            obj.pk = row.pk
+            changed.append(obj)
+    if created:
+        spec.model.objects.bulk_create(created)
+    if changed and compared:
+        spec.model.objects.bulk_update(
+            changed, [field.name for field in compared])
+    return len(created) + len(changed)
+
+
+def key_column(spec):
+    """Csv column holding the spec key."""
+    for column, attribute in spec.fields.items():
+        if attribute == spec.key:
+            return column
+    raise ValueError(f'{spec.name}: no column is mapped to {spec.key}')
+
+
+def row_digest(spec, row):
+    """Hash of the mapped csv columns of a row."""
+    content = '\x1f'.join(
+        '' if row.get(column) is None else str(row[column])
+        for column in spec.fields
+    )
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def changed_rows(spec, rows):
+    """
+    Drop rows recorded with the same content hash.
+
+    Returns the remaining rows and the (new, changed)
+    ImportedRow records to save once the rows are written.
+    """
+    column = key_column(spec)
+    digests = {str(row[column]): row_digest(spec, row) for row in rows}
+    known = {
+        record.key: record for record in ImportedRow.objects.filter(
+            source=spec.name, key__in=list(digests))
+    }
+    new, changed, fresh = [], [], []
+    for row in rows:
+        key = str(row[column])
+        record = known.get(key)
+        if record is None:
+            new.append(ImportedRow(
+                source=spec.name, key=key, digest=digests[key]))
+        elif record.digest != digests[key]:
+            record.digest = digests[key]
+            changed.append(record)
+        else:
+            continue
+        fresh.append(row)
+    return fresh, (new, changed)
+
+
+def save_digests(new, changed):
+    """Record content hashes of written rows."""
+    if new:
+        ImportedRow.objects.bulk_create(new)
+    if changed:
+        ImportedRow.objects.bulk_update(changed, ['digest'])
+
+
+class NotAppendOnly(ValueError):
+    """An append-only file changed before its checkpoint."""
+
+
+class AppendOnlyRows:
+    """
+    Rows of an append-only file without the ones loaded by previous
+    runs. Call save() after the rows are written to move the
+    checkpoint to the end of the file.
+    """
+
+    def __init__(self, spec, rows):
+        self.spec = spec
+        self.rows = rows
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=spec.name)
+        self.count = self.checkpoint.rows
+        self.last_key = self.checkpoint.last_key
+
+    def __iter__(self):
+        column = key_column(self.spec)
+        rows = iter(self.rows)
+        skipped = 0
+        last_key = ''
+        for row in islice(rows, self.checkpoint.rows):
+            skipped += 1
+            last_key = str(row[column])
+        if (skipped, last_key) != (self.checkpoint.rows,
+                                   self.checkpoint.last_key):
+            raise NotAppendOnly(
+                f'{self.spec.name}: the file does not start with the '
+                f'{self.checkpoint.rows} rows loaded before, '
+                f'it is not append-only.')
+        for row in rows:
+            self.count += 1
+            self.last_key = str(row[column])
+            yield row
+
+    def save(self):
+        self.checkpoint.rows = self.count
+        self.checkpoint.last_key = self.last_key
+        self.checkpoint.save(update_fields=['rows', 'last_key'])
+
+
+def reset_sequences(models):
+    """Move primary key sequences past explicitly inserted ids."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def setup_worker():
+    """Prepare a worker process for database access."""
+    if not apps.ready:
+        django.setup()
+
+
+def import_chunk(spec, rows, batch_size, mode):
+    """Worker task: write a chunk of rows of the spec."""
+    return spec.name, import_rows(spec, rows, batch_size, mode)
+
+
+def import_files(sources, batch_size, workers=1, chunk_size=10000,
+                 mode=INSERT):
+    """
+    Import (spec, rows) sources and yield (name, ImportResult, seconds)
+    as each of them finishes.
+
+    With one worker files are loaded in order in this process.
+    Otherwise the independent files of every stage are read
+    round-robin and sent to worker processes in chunks of chunk_size
+    rows, so large files are inserted by several workers at once
+    and every chunk is committed separately. This is only faster
+    on databases with concurrent writers.
+    """
+    if workers <= 1:
+        for spec, rows in sources:
+            started = time.monotonic()
+            result = import_rows(spec, rows, batch_size, mode)
+            yield spec.name, result, time.monotonic() - started
+        return
+
+    rows_by_name = {spec.name: rows for spec, rows in sources}
+    specs = [spec for spec, _ in sources]
+    connections.close_all()
+    with ProcessPoolExecutor(workers, initializer=setup_worker) as pool:
+        for stage in import_stages(specs):
+            yield from import_stage(
+                pool, stage, rows_by_name, batch_size, workers,
+                chunk_size, mode)
+
+
+def import_stage(pool, stage, rows_by_name, batch_size, workers,
+                 chunk_size, mode):
+    """Feed the chunks of a stage to the pool, keeping memory bounded."""
+    return StageImport(
+        pool, stage, rows_by_name, batch_size, chunk_size, mode
+    ).run(workers * 2)
+
+
+class StageImport:
+    """
+    Chunks of the files of a stage read round-robin and imported
+    by a pool, yielding (name, ImportResult, seconds) per file.
+    """
+
+    def __init__(self, pool, stage, rows_by_name, batch_size, chunk_size,
+                 mode):
+        self.pool = pool
+        self.arguments = (batch_size, mode)
+        self.specs = {spec.name: spec for spec in stage}
+        self.readers = {
+            name: batches(rows_by_name[name], chunk_size)
+            for name in self.specs
+        }
+        self.started = {name: time.monotonic() for name in self.readers}
+        self.results = dict.fromkeys(self.readers, ImportResult(0, 0))
+        self.outstanding = dict.fromkeys(self.readers, 0)
+        self.in_flight = set()
+
+    def run(self, max_in_flight):
+        while self.readers or self.in_flight:
+            yield from self.feed(max_in_flight)
+            if self.in_flight:
+                done, self.in_flight = wait(
+                    self.in_flight, return_when=FIRST_COMPLETED)
+                yield from self.collect(done)
+
+    def finished(self, name):
+        return name, self.results[name], time.monotonic() - self.started[name]
+
+    def feed(self, max_in_flight):
+        """Submit a chunk of every file while the pool has room."""
+        for name, reader in list(self.readers.items()):
+            if len(self.in_flight) >= max_in_flight:
+                return
+            chunk = next(reader, None)
+            if chunk is None:
+                del self.readers[name]
+                if not self.outstanding[name]:
+                    yield self.finished(name)
+                continue
+            self.outstanding[name] += 1
+            self.in_flight.add(self.pool.submit(
+                import_chunk, self.specs[name], chunk, *self.arguments))
+
+    def collect(self, futures):
+        """Add up finished chunks, yield files with no chunks left."""
+        for future in futures:
+            name, result = future.result()
+            self.results[name] = ImportResult(
+                self.results[name].rows + result.rows,
+                self.results[name].written + result.written)
+            self.outstanding[name] -= 1
+            if name not in self.readers and not self.outstanding[name]:
+                yield self.finished(name)
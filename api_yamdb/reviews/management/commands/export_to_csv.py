@@ -0,0 +1,126 @@
+import csv
+import gzip
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from reviews.exporting import EXPORT_CHUNK_SIZE, export_rows
+from reviews.importing import IMPORT_SPECS
+
+
+def export_file(spec, directory, chunk_size, compress):
+    """Write one spec to FILE.csv[.gz], return (name, rows, seconds)."""
+    started = time.monotonic()
+    path = os.path.join(directory, f'{spec.name}.csv')
+    if compress:
+        stream = gzip.open(f'{path}.gz', 'wt', encoding='utf-8', newline='')
+    else:
+        stream = open(path, 'w', encoding='utf-8', newline='')
+    count = 0
+    with stream:
+        writer = csv.DictWriter(stream, fieldnames=list(spec.fields))
+        writer.writeheader()
+        for row in export_rows(spec, chunk_size):
+            writer.writerow(row)
+            count += 1
+    return spec.name, count, time.monotonic() - started
+
+
+def export_file_in_thread(spec, *arguments):
+    """Pool task: export a file over the connection of the thread."""
+    try:
+        return export_file(spec, *arguments)
+    finally:
+        connection.close()
+
+
+@contextmanager
+def snapshot():
+    """
+    A transaction seeing one state of the database for all reads:
+    repeatable read on PostgreSQL and MySQL, a read transaction
+    on SQLite.
+    """
+    with transaction.atomic():
+        if connection.vendor in ('postgresql', 'mysql'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        yield
+
+
+class Command(BaseCommand):
+    """
+    The command to export the database to csv files:
+    python manage.py export_to_csv [--output-dir DIR] [--workers N]
+    [--chunk-size N] [--gzip].
+
+    Writes category.csv, genre.csv, titles.csv, genre_title.csv,
+    users.csv, review.csv and comments.csv in the layout
+    import_from_csv reads, so a snapshot can be restored with
+    python manage.py import_from_csv --data-dir DIR.
+
+    Rows are fetched in chunks with server-side cursors where the
+    database supports them and written as they arrive. By default
+    all files are read in one repeatable read transaction, so they
+    form a consistent snapshot. With --workers above 1 files are
+    written concurrently, each over its own connection and
+    transaction: rows written meanwhile may reference rows missing
+    from other files, so such a dump is not a consistent snapshot.
+    """
+    help = "Exporting data to csv files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default='./export',
+            help='Directory for the csv files.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of files written at once. Above 1 the files '
+                 'are not a consistent snapshot.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Number of rows fetched from the database at once.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress files as FILE.csv.gz.',
+        )
+
+    def export_files(self, arguments, workers):
+        """Yield (name, rows, seconds) of every exported file."""
+        if workers <= 1:
+            with snapshot():
+                for spec in IMPORT_SPECS:
+                    yield export_file(spec, *arguments)
+            return
+        with ThreadPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(export_file_in_thread, spec, *arguments)
+                for spec in IMPORT_SPECS
+            ]
+            for future in futures:
+                yield future.result()
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output_dir'], exist_ok=True)
+        arguments = (
+            options['output_dir'], options['chunk_size'], options['gzip'])
+        for name, count, seconds in self.export_files(
+                arguments, options['workers']):
+            rate = count / seconds if seconds else count
+            self.stdout.write(
+                f'{name}: {count} rows exported '
+                f'in {seconds:.2f}s ({rate:.0f} rows/s).')
@@ -1,17 +1,56 @@
-from csv import DictReader
+import json
+import os
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
 
-from reviews.models import Category, Genre, Title, TitleGenre, Review, Comment
-from users.models import CustomUser
+from reviews.importing import (FORMATS, IMPORT_SPECS, INCREMENTAL, INSERT,
+                               UPSERT, AppendOnlyRows, NotAppendOnly,
+                               import_files, load_specs, read_rows,
+                               reset_sequences)
+from reviews.versions import ALL, bump_version
+
+DATA_DIR = './static/data'
 
 
 class Command(BaseCommand):
     """
     The command to import data from csv files to database:
-    python manage.py import_from_csv.
+    python manage.py import_from_csv [--data-dir DIR]
+    [--source FILE=PATH ...] [--format csv|jsonl] [--mapping JSON]
+    [--batch-size N] [--workers N]
+    [--upsert | --incremental] [--append-only FILE ...].
+
+    By default every file is read from --data-dir as FILE.csv or
+    FILE.csv.gz. --source loads only the given files from other
+    paths: '-' reads stdin, *.gz files are decompressed on the fly
+    and *.jsonl or *.ndjson files hold one JSON object per line
+    (--format overrides the guess, e.g. for stdin). --mapping points
+    to a JSON file of {"FILE": {"column": "model_attribute"}}
+    replacing the default column mapping of the listed files.
+    Sources are read as streams, so memory does not grow with
+    file size.
+
+    Each file is inserted with bulk_create in batches inside a
+    single transaction. With --workers above 1 files that do
+    not depend on each other are loaded concurrently by worker
+    processes, and every file is split into --chunk-size chunks
+    committed separately, so a failed chunk leaves the earlier ones
+    in place. That only pays off on a database taking concurrent
+    writes and is refused on SQLite, which has a single writer.
+    Bulk writes skip signals, so when any row
+    was written all API cache versions are bumped afterwards, title
+    ratings are rebuilt if reviews were written and the title search
+    index if titles were.
 
-    If you need to update the database:
+    Use --upsert to refresh an already loaded database: rows are
+    matched by primary key, new ones are inserted, changed ones are
+    updated and unchanged ones are left alone. --incremental also
+    records a content hash per row and skips rows with an unchanged
+    hash without touching their tables. Files named by --append-only
+    resume after the rows loaded by the previous run.
+
+    To load from scratch instead:
     1) Remove db.sqlite3
     2) Make migrations (python manage.py migrate --run-syncdb).
 
@@ -19,77 +58,149 @@ class Command(BaseCommand):
     """
     help = "Loading data from csv files."
 
+    def add_arguments(self, parser):
+        file_names = [spec.name for spec in IMPORT_SPECS]
+        parser.add_argument(
+            '--data-dir',
+            default=DATA_DIR,
+            help='Directory with FILE.csv files.',
+        )
+        parser.add_argument(
+            '--source',
+            action='append',
+            default=[],
+            metavar='FILE=PATH',
+            help=f'Path of one of {", ".join(file_names)}; - for stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Format of all sources instead of guessing by suffix.',
+        )
+        parser.add_argument(
+            '--mapping',
+            help='JSON file with column to model attribute mappings.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows per INSERT statement.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes, 1 on SQLite.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Number of rows sent to a worker process at once.',
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--upsert',
+            action='store_const',
+            dest='mode',
+            const=UPSERT,
+            default=INSERT,
+            help='Insert new and update changed rows of existing data.',
+        )
+        mode.add_argument(
+            '--incremental',
+            action='store_const',
+            dest='mode',
+            const=INCREMENTAL,
+            help='Write only rows changed since the previous import.',
+        )
+        parser.add_argument(
+            '--append-only',
+            nargs='+',
+            default=[],
+            choices=file_names,
+            metavar='FILE',
+            help='Files that only grow: skip rows loaded before.',
+        )
+
+    def get_specs(self, options):
+        if not options['mapping']:
+            return load_specs()
+        try:
+            with open(options['mapping'], encoding='utf-8') as mapping:
+                return load_specs(json.load(mapping))
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Invalid --mapping: {error}')
+
+    def get_paths(self, specs, options):
+        if not options['source']:
+            paths = {}
+            for spec in specs:
+                path = os.path.join(options['data_dir'], f'{spec.name}.csv')
+                if not os.path.exists(path) and os.path.exists(f'{path}.gz'):
+                    path = f'{path}.gz'
+                paths[spec.name] = path
+            return paths
+        names = {spec.name for spec in specs}
+        paths = {}
+        for source in options['source']:
+            name, separator, path = source.partition('=')
+            if not separator or name not in names:
+                raise CommandError(f'Invalid --source {source}')
+            paths[name] = path
+        if list(paths.values()).count('-') > 1:
+            raise CommandError('Only one source can be read from stdin')
+        return paths
+
+    def import_sources(self, sources, checkpoints, options):
+        """Import the sources, return the names of the written ones."""
+        written = set()
+        for name, result, seconds in import_files(
+                sources,
+                options['batch_size'],
+                options['workers'],
+                options['chunk_size'],
+                options['mode']):
+            if name in checkpoints:
+                checkpoints[name].save()
+            if result.written:
+                written.add(name)
+            rate = result.rows / seconds if seconds else result.rows
+            self.stdout.write(
+                f'{name}: {result.rows} rows read, {result.written} '
+                f'written in {seconds:.2f}s ({rate:.0f} rows/s).')
+        return written
+
     def handle(self, *args, **options):
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError(
+                'SQLite writes one transaction at a time, --workers above '
+                '1 would only split the import into separate commits.')
+        specs = self.get_specs(options)
+        paths = self.get_paths(specs, options)
+        sources = []
+        checkpoints = {}
+        for spec in specs:
+            if spec.name not in paths:
+                continue
+            rows = read_rows(paths[spec.name], options['format'])
+            if spec.name in options['append_only']:
+                rows = checkpoints[spec.name] = AppendOnlyRows(spec, rows)
+            sources.append((spec, rows))
+
+        try:
+            written = self.import_sources(sources, checkpoints, options)
+        except NotAppendOnly as error:
+            raise CommandError(error)
+        if not written:
+            return
 
-        for row in DictReader(
-                open('./static/data/category.csv', encoding='utf-8')):
-            category = Category(
-                id=row['id'],
-                name=row['name'],
-                slug=row['slug']
-            )
-            category.save()
-
-        for row in DictReader(
-                open('./static/data/genre.csv', encoding='utf-8')):
-            genre = Genre(
-                id=row['id'],
-                name=row['name'],
-                slug=row['slug'],
-            )
-            genre.save()
-
-        for row in DictReader(
-                open('./static/data/titles.csv', encoding='utf-8')):
-            title = Title(
-                id=row['id'],
-                name=row['name'],
-                year=row['year'],
-                category_id=row['category'],
-            )
-            title.save()
-
-        for row in DictReader(
-                open('./static/data/genre_title.csv', encoding='utf-8')):
-            genre_title = TitleGenre(
-                id=row['id'],
-                title_id=row['title_id'],
-                genre_id=row['genre_id'],
-            )
-            genre_title.save()
-
-        for row in DictReader(
-                open('./static/data/users.csv', encoding='utf-8')):
-            user = CustomUser(
-                id=row['id'],
-                username=row['username'],
-                email=row['email'],
-                role=row['role'],
-                bio=row['bio'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-            )
-            user.save()
-
-        for row in DictReader(
-                open('./static/data/review.csv', encoding='utf-8')):
-            review = Review(
-                id=row['id'],
-                title_id=row['title_id'],
-                text=row['text'],
-                author_id=row['author'],
-                score=row['score'],
-                pub_date=row['pub_date'],
-            )
-            review.save()
-
-        for row in DictReader(
-                open('./static/data/comments.csv', encoding='utf-8')):
-            comments = Comment(
-                id=row['id'],
-                review_id=row['review_id'],
-                text=row['text'],
-                author_id=row['author'],
-                pub_date=row['pub_date'],
-            )
-            comments.save()
+        reset_sequences([
+            spec.model for spec, _ in sources if spec.name in written])
+        # Bulk writes skip signals: outdate every API cache and ETag
+        bump_version(ALL)
+        if 'review' in written:
+            call_command('rebuild_ratings', stdout=self.stdout)
+        if 'titles' in written:
+            call_command('rebuild_title_search', stdout=self.stdout)
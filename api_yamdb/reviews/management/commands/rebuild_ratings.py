@@ -0,0 +1,45 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from reviews.models import Review, Title
+from reviews.versions import ALL, bump_version
+
+
+class Command(BaseCommand):
+    """
+    The command to recalculate stored title ratings from reviews:
+    python manage.py rebuild_ratings.
+
+    Use it to repair the counters after bulk loads or manual
+    database edits that bypass review signals.
+    """
+    help = "Rebuilding title rating counters from reviews."
+
+    def handle(self, *args, **options):
+        reviews = (
+            Review.objects
+            .filter(title=OuterRef('pk'))
+            .order_by()
+            .values('title')
+        )
+        with transaction.atomic():
+            updated = Title.objects.update(
+                rating_sum=Coalesce(
+                    Subquery(
+                        reviews.annotate(total=Sum('score')).values('total'),
+                        output_field=IntegerField()
+                    ),
+                    0
+                ),
+                rating_count=Coalesce(
+                    Subquery(
+                        reviews.annotate(total=Count('pk')).values('total'),
+                        output_field=IntegerField()
+                    ),
+                    0
+                ),
+            )
+            bump_version(ALL)
+        self.stdout.write(f'Rebuilt ratings for {updated} titles.')
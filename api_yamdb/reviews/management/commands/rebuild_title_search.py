@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from reviews.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    The command to rebuild the title full-text search index:
+    python manage.py rebuild_title_search.
+
+    Use it after bulk loads or manual database edits
+    that bypass title signals.
+    """
+    help = "Rebuilding the title search index."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.setup()
+        backend.rebuild()
+        self.stdout.write('Rebuilt the title search index.')
@@ -63,6 +63,16 @@ class Title(models.Model):
         verbose_name='Genre',
         through='TitleGenre',
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Sum of review scores'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Number of reviews'
+    )
 
     class Meta:
         ordering = ('name',)
@@ -72,6 +82,13 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        """Average review score kept up to date by review signals."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
 
 class TitleGenre(models.Model):
     """Model of connection between genres and titles."""
@@ -134,6 +151,12 @@ class Review(models.Model):
                 name='unique_author_title'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
 
 
 class Comment(models.Model):
@@ -161,6 +184,81 @@ class Comment(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'comments'
         verbose_name_plural = 'comments'
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text
+
+
+class ImportedRow(models.Model):
+    """Content hash of a row loaded by the incremental csv import."""
+
+    source = models.CharField(max_length=64, verbose_name='Source file')
+    key = models.CharField(max_length=255, verbose_name='Row key')
+    digest = models.CharField(max_length=32, verbose_name='Content hash')
+
+    class Meta:
+        verbose_name = 'Imported row'
+        verbose_name_plural = 'Imported rows'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'key'],
+                name='unique_imported_row'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.source} {self.key}'
+
+
+class ImportCheckpoint(models.Model):
+    """Rows already loaded from an append-only import file."""
+
+    source = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Source file'
+    )
+    rows = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Loaded rows'
+    )
+    last_key = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Key of the last loaded row'
+    )
+
+    class Meta:
+        verbose_name = 'Import checkpoint'
+        verbose_name_plural = 'Import checkpoints'
+
+    def __str__(self):
+        return f'{self.source}: {self.rows}'
+
+
+class ScopeVersion(models.Model):
+    """
+    Version of a group of data, bumped on every change of it.
+    API caches and ETags are keyed by these versions.
+    """
+
+    scope = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Scope'
+    )
+    version = models.BigIntegerField(verbose_name='Version')
+    modified = models.DateTimeField(verbose_name='Last change')
+
+    class Meta:
+        verbose_name = 'Scope version'
+        verbose_name_plural = 'Scope versions'
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
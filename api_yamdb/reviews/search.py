@@ -0,0 +1,118 @@
+"""Full-text search over title names and descriptions."""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Title
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BaseTitleSearchBackend:
+    """Interface of title search backends."""
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def setup(self):
+        """Create the index storage if the backend needs one."""
+
+    def index(self, title):
+        """Add or refresh a title in the index."""
+
+    def remove(self, title_id):
+        """Drop a title from the index."""
+
+    def rebuild(self):
+        """Reindex all titles from scratch."""
+
+    def search(self, queryset, query):
+        """Filter the title queryset by query, best matches first."""
+        raise NotImplementedError
+
+
+class IContainsTitleSearchBackend(BaseTitleSearchBackend):
+    """Unindexed fallback for databases without a native backend."""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for token in TOKEN_RE.findall(query):
+            condition &= (
+                Q(name__icontains=token) | Q(description__icontains=token)
+            )
+        return queryset.filter(condition)
+
+
+class SQLiteFTS5TitleSearchBackend(BaseTitleSearchBackend):
+    """SQLite FTS5 index ranked with bm25."""
+
+    table = 'reviews_title_fts'
+
+    def execute(self, sql, params=()):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+        return None
+
+    def setup(self):
+        self.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+            f"name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        indexed = self.execute(f'SELECT COUNT(*) FROM {self.table}')[0][0]
+        if indexed != Title.objects.using(self.using).count():
+            self.rebuild()
+
+    def index(self, title):
+        self.remove(title.pk)
+        self.execute(
+            f'INSERT INTO {self.table} (rowid, name, description) '
+            f'VALUES (%s, %s, %s)',
+            (title.pk, title.name, title.description or '')
+        )
+
+    def remove(self, title_id):
+        self.execute(
+            f'DELETE FROM {self.table} WHERE rowid = %s', (title_id,))
+
+    def rebuild(self):
+        self.execute(f'DELETE FROM {self.table}')
+        self.execute(
+            f'INSERT INTO {self.table} (rowid, name, description) '
+            f"SELECT id, name, COALESCE(description, '') "
+            f'FROM {Title._meta.db_table}'
+        )
+
+    def search(self, queryset, query):
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return queryset.none()
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        title_table = Title._meta.db_table
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.rowid = {title_table}.id',
+                f'{self.table} MATCH %s',
+            ],
+            params=[match],
+            select={'search_rank': f'{self.table}.rank'},
+            order_by=['search_rank'],
+        )
+
+
+def get_search_backend(using='default'):
+    """
+    Return the backend from TITLE_SEARCH_BACKEND or the default
+    one for the database vendor.
+    """
+    backend_path = getattr(settings, 'TITLE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)(using)
+    if connections[using].vendor == 'sqlite':
+        return SQLiteFTS5TitleSearchBackend(using)
+    return IContainsTitleSearchBackend(using)
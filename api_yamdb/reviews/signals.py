@@ -0,0 +1,66 @@
+"""Signal handlers keeping title ratings and search index in sync."""
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Review, Title
+from .search import get_search_backend
+
+
+def setup_title_search(sender, using, **kwargs):
+    """Create the title search index once the title table exists."""
+    if Title._meta.db_table in connections[using].introspection.table_names():
+        get_search_backend(using).setup()
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, using, **kwargs):
+    """Refresh a saved title in the search index."""
+    get_search_backend(using).index(instance)
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, using, **kwargs):
+    """Drop a deleted title from the search index."""
+    get_search_backend(using).remove(instance.pk)
+
+
+@receiver(post_init, sender=Review)
+def remember_review_score(sender, instance, **kwargs):
+    """Remember the loaded score to compute the delta on update."""
+    instance._saved_score = instance.__dict__.get('score')
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(sender, instance, created, **kwargs):
+    """Add a new or changed review score to the title counters."""
+    if created:
+        Title.objects.filter(pk=instance.title_id).update(
+            rating_sum=F('rating_sum') + int(instance.score),
+            rating_count=F('rating_count') + 1,
+        )
+    elif instance._saved_score is not None:
+        delta = int(instance.score) - int(instance._saved_score)
+        if delta:
+            Title.objects.filter(pk=instance.title_id).update(
+                rating_sum=Greatest(F('rating_sum') + delta, 0),
+            )
+    instance._saved_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(sender, instance, **kwargs):
+    """
+    Subtract a deleted review score from the title counters. They
+    stop at zero: counters drifted by writes that skip signals give
+    a wrong rating until rebuild_ratings instead of a failed delete.
+    """
+    score = instance._saved_score
+    if score is None:
+        score = instance.score
+    Title.objects.filter(pk=instance.title_id).update(
+        rating_sum=Greatest(F('rating_sum') - int(score), 0),
+        rating_count=Greatest(F('rating_count') - 1, 0),
+    )
@@ -0,0 +1,112 @@
+"""
+Versions of data scopes stored in the database
+
+Every change of a scope, like titles or reviews:<title_id>, bumps
+its version, so all processes see the same versions whatever cache
+they use. Bumping ALL changes every versions tag at once, for bulk
+writes that skip signals. Versions jump to the current time in
+microseconds when that is larger, so a database restored from a
+backup does not hand out versions seen before.
+
+With VERSIONS_CACHE_ALIAS naming a cache shared by all processes,
+like Redis or Memcached, versions are read from it and the database
+is only queried for scopes missing there. Bumps write the new
+version to the cache, readers only add missing ones, so a reader
+racing a bump cannot put back an older version. Per-process caches
+must not be used: a bump in one process would not reach the others.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ScopeVersion
+
+ALL = 'all'
+
+# Bounds how long a cached version outlives a database restore
+VERSIONS_CACHE_TIMEOUT = 3600
+
+
+def get_versions_cache():
+    alias = getattr(settings, 'VERSIONS_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def version_key(scope):
+    return f'scope-version:{scope}'
+
+
+def load_versions(scopes):
+    """{scope: (version, modified)} from the database in one query."""
+    found = {
+        row.scope: (row.version, row.modified)
+        for row in ScopeVersion.objects.filter(scope__in=scopes)
+    }
+    return {scope: found.get(scope, (0, None)) for scope in scopes}
+
+
+def get_versions(scopes):
+    """
+    {scope: (version, modified)} of the scopes and ALL, (0, None)
+    for scopes never bumped. Reads the versions cache if there is
+    one and queries the database once for the scopes it misses.
+    """
+    scopes = [*scopes, ALL]
+    cache = get_versions_cache()
+    if cache is None:
+        return load_versions(scopes)
+    cached = cache.get_many([version_key(scope) for scope in scopes])
+    versions = {
+        scope: cached[version_key(scope)] for scope in scopes
+        if version_key(scope) in cached
+    }
+    missing = [scope for scope in scopes if scope not in versions]
+    if missing:
+        for scope, version in load_versions(missing).items():
+            cache.add(version_key(scope), version, VERSIONS_CACHE_TIMEOUT)
+            versions[scope] = version
+    return {scope: versions[scope] for scope in scopes}
+
+
+def versions_tag(versions):
+    """Stable text of the versions for cache keys and ETags."""
+    return ','.join(
+        f'{scope}={version}'
+        for scope, (version, _) in sorted(versions.items())
+    )
+
+
+def last_modified(versions):
+    """Timestamp of the latest change of the versions, if known."""
+    dates = [modified for _, modified in versions.values() if modified]
+    return int(max(dates).timestamp()) if dates else None
+
+
+def bump_version(scope):
+    now = timezone.now()
+    version = time.time_ns() // 1000
+    changes = {
+        'version': Greatest(F('version') + 1, Value(version)),
+        'modified': now,
+    }
+    if not ScopeVersion.objects.filter(scope=scope).update(**changes):
+        try:
+            with transaction.atomic():
+                ScopeVersion.objects.create(
+                    scope=scope, version=version, modified=now)
+        except IntegrityError:
+            ScopeVersion.objects.filter(scope=scope).update(**changes)
+    if get_versions_cache() is not None:
+        # Not before the data changed with the version is visible
+        transaction.on_commit(lambda: cache_version(scope))
+
+
+def cache_version(scope):
+    get_versions_cache().set(
+        version_key(scope), load_versions([scope])[scope],
+        VERSIONS_CACHE_TIMEOUT)
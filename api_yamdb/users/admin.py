@@ -3,6 +3,7 @@ CustomUserModel admin zone registration
 """
 from django.contrib import admin
 
-from .models import CustomUser
+from .models import CustomUser, OutboxEmail
 
 admin.site.register(CustomUser)
+admin.site.register(OutboxEmail)
@@ -0,0 +1,93 @@
+"""
+In-process cache of user rows
+
+A size-bounded LRU of users keyed by primary key whose entries expire
+after a short timeout. Only field values are stored and every hit
+builds a fresh instance, so callers may modify the returned users.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+USER_CACHE_DEFAULTS = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 30,
+}
+
+
+def user_cache_setting(name):
+    return {
+        **USER_CACHE_DEFAULTS,
+        **getattr(settings, 'USER_CACHE', {}),
+    }[name]
+
+
+class UserCache:
+    """Thread safe LRU + TTL cache with hit and miss counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pk, loader):
+        """Return a copy of the cached user pk or of the loader() result."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(pk)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(pk)
+                self.hits += 1
+                return self.build(entry)
+            self.misses += 1
+        entry = self.dump(loader())
+        self.store(pk, entry)
+        return self.build(entry)
+
+    def dump(self, user):
+        return (
+            time.monotonic() + user_cache_setting('TIMEOUT'),
+            type(user),
+            user._state.db,
+            tuple(
+                getattr(user, field.attname)
+                for field in user._meta.concrete_fields
+            ),
+        )
+
+    def build(self, entry):
+        _, model, db, values = entry
+        field_names = [field.attname for field in model._meta.concrete_fields]
+        return model.from_db(db, field_names, values)
+
+    def store(self, pk, entry):
+        with self.lock:
+            self.entries[pk] = entry
+            self.entries.move_to_end(pk)
+            while len(self.entries) > user_cache_setting('MAX_SIZE'):
+                self.entries.popitem(last=False)
+
+    def invalidate(self, pk):
+        with self.lock:
+            self.entries.pop(pk, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+            }
+
+
+user_cache = UserCache()
@@ -0,0 +1,181 @@
+"""
+Background delivery of outgoing email
+
+Messages are stored in the OutboxEmail table and handed to worker
+threads, which send them in batches over one backend connection and
+retry failed deliveries. Rows that were not delivered before a restart
+are picked up by the send_queued_mail management command.
+
+Every sender first claims the rows it delivers for CLAIM_TIMEOUT
+seconds, so workers and the command never send the same email twice.
+"""
+import logging
+import queue
+import threading
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+MAILER_DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 1,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'CLAIM_TIMEOUT': 300,
+}
+
+
+def mailer_setting(name):
+    return getattr(settings, 'MAILER', {}).get(name, MAILER_DEFAULTS[name])
+
+
+def claim(pks):
+    """
+    Claim the pending, unclaimed emails among pks for one attempt
+    with a single conditional UPDATE and return them.
+    """
+    token = uuid4().hex
+    now = timezone.now()
+    OutboxEmail.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+        pk__in=pks,
+        sent__isnull=True,
+        attempts__lt=mailer_setting('MAX_ATTEMPTS'),
+    ).update(
+        claim=token,
+        claimed_until=now + timedelta(
+            seconds=mailer_setting('CLAIM_TIMEOUT')),
+        attempts=F('attempts') + 1,
+    )
+    return list(OutboxEmail.objects.filter(pk__in=pks, claim=token))
+
+
+def deliver(pks):
+    """Send pending outbox emails over a single backend connection."""
+    emails = claim(pks)
+    if not emails:
+        return []
+    failed = []
+    backend = None
+    try:
+        backend = get_connection()
+        backend.open()
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients.split(','),
+                connection=backend,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                logger.warning('Email %s delivery failed: %s', email.pk, error)
+                email.last_error = str(error)
+                failed.append(email)
+            else:
+                email.sent = timezone.now()
+                email.last_error = ''
+    except Exception as error:
+        logger.warning('Mail backend is unavailable: %s', error)
+        for email in emails:
+            if email.sent is None and email not in failed:
+                email.last_error = str(error)
+                failed.append(email)
+    finally:
+        if backend is not None:
+            backend.close()
+    for email in emails:
+        email.claimed_until = None
+    OutboxEmail.objects.bulk_update(
+        emails, ['sent', 'last_error', 'claimed_until'])
+    return [
+        email.pk for email in failed
+        if email.attempts < mailer_setting('MAX_ATTEMPTS')
+    ]
+
+
+class MailDispatcher:
+    """In-process queue of outbox email ids served by worker threads."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.workers = []
+
+    def submit(self, pk):
+        if not mailer_setting('ASYNC'):
+            deliver([pk])
+            return
+        self.start()
+        self.queue.put(pk)
+
+    def start(self):
+        with self.lock:
+            self.workers = [
+                worker for worker in self.workers if worker.is_alive()
+            ]
+            while len(self.workers) < mailer_setting('WORKERS'):
+                worker = threading.Thread(
+                    target=self.work, name='mail-worker', daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def requeue(self, pks):
+        for pk in pks:
+            self.queue.put(pk)
+
+    def retry_later(self, pks):
+        """Queue the failed batch again after RETRY_DELAY seconds."""
+        if not pks:
+            return
+        timer = threading.Timer(
+            mailer_setting('RETRY_DELAY'), self.requeue, args=(list(pks),))
+        timer.daemon = True
+        timer.start()
+
+    def work(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < mailer_setting('BATCH_SIZE'):
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            close_old_connections()
+            try:
+                self.retry_later(deliver(batch))
+            except Exception:
+                logger.exception('Email batch delivery failed')
+                self.retry_later(batch)
+            finally:
+                connection.close()
+
+
+dispatcher = MailDispatcher()
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """
+    Store an email in the outbox and deliver it in the background
+    once the current transaction commits
+    """
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=','.join(recipient_list),
+    )
+    transaction.on_commit(lambda: dispatcher.submit(email.pk))
+    return email
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from users.mail import deliver, mailer_setting
+from users.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    """
+    The command to deliver emails left in the outbox:
+    python manage.py send_queued_mail.
+
+    Run it after a restart or from cron to flush messages
+    the background workers did not deliver.
+    """
+    help = "Sending pending outbox emails."
+
+    def handle(self, *args, **options):
+        pending = list(
+            OutboxEmail.objects
+            .filter(sent__isnull=True,
+                    attempts__lt=mailer_setting('MAX_ATTEMPTS'))
+            .values_list('pk', flat=True)
+        )
+        batch_size = mailer_setting('BATCH_SIZE')
+        failed = 0
+        for start in range(0, len(pending), batch_size):
+            failed += len(deliver(pending[start:start + batch_size]))
+        self.stdout.write(
+            f'Processed {len(pending)} emails, {failed} left for retry.')
@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 04:00
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_outboxemail'),
+    ]
+
+    # SQLite rebuilds the table to drop a column and cannot copy
+    # expression indexes, so they are dropped and added around it.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='users_username_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='users_email_lower_idx',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='confirmation_code',
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='users_username_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='users_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_remove_customuser_confirmation_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxemail',
+            name='claim',
+            field=models.CharField(blank=True, help_text='Token of the sender delivering the email', max_length=32, verbose_name='Delivery claim'),
+        ),
+        migrations.AddField(
+            model_name='outboxemail',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Claimed until'),
+        ),
+    ]
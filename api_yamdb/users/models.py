@@ -1,8 +1,51 @@
 """
 Users app models configuration
 """
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import BooleanField, ExpressionWrapper, Q, Value
+from django.db.models.functions import Lower
+
+
+class CustomUserQuerySet(models.QuerySet):
+    """
+    Case-insensitive username and email lookups
+    served by the lower() functional indexes
+    """
+    def alias_lower(self):
+        return self.alias(
+            username_lower=Lower('username'),
+            email_lower=Lower('email'),
+        )
+
+    def by_username(self, username):
+        return self.alias_lower().filter(
+            username_lower=Lower(Value(username)))
+
+    def by_email(self, email):
+        return self.alias_lower().filter(
+            email_lower=Lower(Value(email)))
+
+    def by_username_or_email(self, username, email):
+        """
+        Users matching the username or the email, annotated with
+        username_match and email_match flags
+        """
+        username_match = Q(username_lower=Lower(Value(username)))
+        email_match = Q(email_lower=Lower(Value(email)))
+        return self.alias_lower().filter(
+            username_match | email_match
+        ).annotate(
+            username_match=ExpressionWrapper(
+                username_match, output_field=BooleanField()),
+            email_match=ExpressionWrapper(
+                email_match, output_field=BooleanField()),
+        )
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    """CustomUser manager with case-insensitive lookups"""
+    pass
 
 
 class CustomUser(AbstractUser):
@@ -47,16 +90,18 @@ class CustomUser(AbstractUser):
         verbose_name='User biography',
         blank=True,)
 
-    confirmation_code = models.CharField(
-        verbose_name='Confirmation Code',
-        max_length=64,
-        editable=False,
-    )
+    objects = CustomUserManager()
 
     USERNAME_FIELD = 'username'
     EMAIL_FIELD = 'email'
     REQUIRED_FIELDS = ['email', ]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower('username'), name='users_username_lower_idx'),
+            models.Index(Lower('email'), name='users_email_lower_idx'),
+        ]
+
     @property
     def is_admin_or_super_user(self):
         return self.role == self.ADMIN or self.is_superuser
@@ -64,3 +109,61 @@ class CustomUser(AbstractUser):
     @property
     def is_moderator(self):
         return self.role == self.MODERATOR
+
+
+class OutboxEmail(models.Model):
+    """Outgoing email stored until it is delivered"""
+    subject = models.CharField(
+        verbose_name='Subject',
+        max_length=255,)
+
+    body = models.TextField(
+        verbose_name='Body',)
+
+    from_email = models.CharField(
+        verbose_name='From',
+        max_length=254,)
+
+    recipients = models.TextField(
+        verbose_name='Recipients',
+        help_text='Comma separated addresses',)
+
+    created = models.DateTimeField(
+        verbose_name='Created',
+        auto_now_add=True,)
+
+    sent = models.DateTimeField(
+        verbose_name='Sent',
+        null=True,
+        blank=True,)
+
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Delivery attempts',
+        default=0,)
+
+    last_error = models.TextField(
+        verbose_name='Last delivery error',
+        blank=True,)
+
+    claim = models.CharField(
+        verbose_name='Delivery claim',
+        help_text='Token of the sender delivering the email',
+        max_length=32,
+        blank=True,)
+
+    claimed_until = models.DateTimeField(
+        verbose_name='Claimed until',
+        null=True,
+        blank=True,)
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Outbox email'
+        verbose_name_plural = 'Outbox emails'
+        indexes = [
+            models.Index(fields=['sent', 'attempts'],
+                         name='users_outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipients}'
@@ -0,0 +1,37 @@
+"""
+Stateless confirmation codes
+
+A code is the base36 timestamp of its creation and an HMAC of the
+user and that timestamp, so it is checked without storing anything
+and expires after settings.CONFIRMATION_CODE_TIMEOUT seconds.
+"""
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
+
+KEY_SALT = 'users.tokens.confirmation_code'
+
+
+def make_confirmation_code(user, timestamp=None):
+    if timestamp is None:
+        timestamp = int(time.time())
+    digest = salted_hmac(
+        KEY_SALT,
+        f'{user.pk}{user.username}{user.email}{user.password}{timestamp}',
+        algorithm='sha256',
+    ).hexdigest()[::2]
+    return f'{int_to_base36(timestamp)}-{digest}'
+
+
+def check_confirmation_code(user, code):
+    """Whether code was made for user and has not expired."""
+    try:
+        timestamp = base36_to_int(str(code).split('-', 1)[0])
+    except ValueError:
+        return False
+    if not constant_time_compare(make_confirmation_code(user, timestamp),
+                                 code):
+        return False
+    return 0 <= time.time() - timestamp <= settings.CONFIRMATION_CODE_TIMEOUT
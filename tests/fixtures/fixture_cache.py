@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import cache
+
+from api.v1.throttling import get_counter_store
+from users.cache import user_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    user_cache.clear()
+    get_counter_store().clear()
+    yield
+    cache.clear()
+    user_cache.clear()
+    get_counter_store().clear()
@@ -0,0 +1,60 @@
+import csv
+
+import pytest
+
+CSV_DATA = {
+    'category': (
+        ('id', 'name', 'slug'),
+        (1, 'Фильм', 'movie'),
+        (2, 'Книга', 'book'),
+    ),
+    'genre': (
+        ('id', 'name', 'slug'),
+        (1, 'Драма', 'drama'),
+        (2, 'Комедия', 'comedy'),
+    ),
+    'titles': (
+        ('id', 'name', 'year', 'category'),
+        (1, 'Побег из Шоушенка', 1994, 1),
+        (2, 'Крестный отец', 1972, 1),
+        (3, 'Мастер и Маргарита', 1967, 2),
+    ),
+    'genre_title': (
+        ('id', 'title_id', 'genre_id'),
+        (1, 1, 1),
+        (2, 2, 1),
+        (3, 3, 2),
+    ),
+    'users': (
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+        (100, 'bingobongo', 'bingobongo@yamdb.fake', 'user', '', '', ''),
+        (101, 'capt_obvious', 'capt_obvious@yamdb.fake', 'admin', '', '',
+         ''),
+    ),
+    'review': (
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        (1, 1, 'Ставлю десять звёзд!', 100, 10, '2019-09-24T21:08:21.567Z'),
+        (2, 1, 'Не понравилось', 101, 4, '2019-09-25T10:00:00.000Z'),
+        (3, 2, 'Классика', 100, 9, '2020-01-13T23:20:02.422Z'),
+    ),
+    'comments': (
+        ('id', 'review_id', 'text', 'author', 'pub_date'),
+        (1, 1, 'Согласен', 101, '2019-09-26T08:00:00.000Z'),
+        (2, 2, 'Не согласен', 100, '2019-09-27T08:00:00.000Z'),
+    ),
+}
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as stream:
+        csv.writer(stream).writerows(rows)
+
+
+@pytest.fixture
+def csv_data_dir(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for name, rows in CSV_DATA.items():
+        write_csv(data_dir / f'{name}.csv', rows)
+    return data_dir
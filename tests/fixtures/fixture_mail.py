@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_mail_delivery(settings):
+    settings.MAILER = {**settings.MAILER, 'ASYNC': False}
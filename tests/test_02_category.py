@@ -1,6 +1,8 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_name_and_slug_patterns, check_pagination, check_permissions,
@@ -153,3 +155,36 @@ class Test02CategoryAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, self.CATEGORY_URL, data,
                           'модератора', categories, HTTPStatus.FORBIDDEN)
+
+    def test_06_category_list_without_count(self, client, admin_client):
+        create_categories(admin_client)
+        slugs = [
+            category['slug'] for category
+            in client.get(self.CATEGORY_URL).json()['results']
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                self.CATEGORY_URL, {'limit': 1, 'count': 'false'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            f'Проверьте, что при запросе к `{self.CATEGORY_URL}` с '
+            '`?count=false` в ответе нет ключа `count`.'
+        )
+        assert not any('COUNT(' in query['sql'].upper()
+                       for query in context.captured_queries), (
+            'Проверьте, что с `?count=false` не выполняется COUNT(*).'
+        )
+        assert [category['slug'] for category in data['results']] == slugs[:1]
+        assert 'limit=1' in data['next'] and 'offset=1' in data['next'], (
+            'Проверьте, что при `?count=false` ссылка `next` строится, '
+            'если после страницы есть ещё объекты.'
+        )
+
+        data = client.get(data['next']).json()
+        assert [category['slug'] for category in data['results']] == slugs[1:]
+        assert data['next'] is None, (
+            'Проверьте, что при `?count=false` на последней странице '
+            'ссылка `next` пустая.'
+        )
+        assert data['previous']
@@ -353,3 +353,57 @@ class Test04TitleAPI:
             f'Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_titles_search(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        data = {
+            'name': 'Золотой орешек',
+            'year': 1990,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+            'description': 'Сказка про белку и орешки.',
+        }
+        response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        nut_id = response.json()['id']
+
+        response = client.get(self.TITLES_URL, {'q': 'оре'})
+        assert response.status_code == HTTPStatus.OK
+        found = [title['id'] for title in response.json()['results']]
+        assert found == [nut_id, titles[1]['id']], (
+            f'Проверьте, что поиск `{self.TITLES_URL}?q=` находит '
+            'произведения по началу слова в названии и описании и '
+            'выводит лучшие совпадения первыми.'
+        )
+        response = client.get(self.TITLES_URL, {'q': 'крепк yippie'})
+        found = [title['id'] for title in response.json()['results']]
+        assert found == [titles[1]['id']], (
+            'Проверьте, что поиск находит только произведения, '
+            'содержащие все слова запроса.'
+        )
+        response = client.get(self.TITLES_URL, {'q': '!!!'})
+        assert response.json()['results'] == []
+
+    def test_08_titles_search_index_sync(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        response = admin_client.patch(url, data={'name': 'Робокоп'})
+        assert response.status_code == HTTPStatus.OK
+
+        response = client.get(self.TITLES_URL, {'q': 'робокоп'})
+        found = [title['id'] for title in response.json()['results']]
+        assert found == [titles[0]['id']], (
+            'Проверьте, что изменённое произведение находится поиском '
+            'по новому названию.'
+        )
+        response = client.get(self.TITLES_URL, {'q': 'терминатор'})
+        assert response.json()['results'] == [], (
+            'Проверьте, что изменённое произведение не находится поиском '
+            'по старому названию.'
+        )
+
+        admin_client.delete(url)
+        response = client.get(self.TITLES_URL, {'q': 'робокоп'})
+        assert response.json()['results'] == [], (
+            'Проверьте, что удалённое произведение не находится поиском.'
+        )
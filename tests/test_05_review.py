@@ -3,9 +3,11 @@ from http import HTTPStatus
 import pytest
 from django.db.utils import IntegrityError
 
+from api.v1.pagination import PubDateCursorPagination
+from reviews.models import Review, Title
 from tests.utils import (
-    check_fields, check_pagination, create_reviews, create_single_review,
-    create_titles
+    check_cursor_pagination, check_fields, check_pagination, create_reviews,
+    create_single_review, create_titles
 )
 
 
@@ -413,3 +415,34 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_reviews_cursor_pagination(self, client, admin_client, admin,
+                                          user, user_client, moderator,
+                                          moderator_client, monkeypatch):
+        monkeypatch.setattr(PubDateCursorPagination, 'page_size', 2)
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        pages = check_cursor_pagination(
+            client, url, [review['id'] for review in reversed(reviews)])
+        assert pages == 2
+
+    def test_08_review_delete_with_drifted_rating(self, admin_client, admin):
+        titles, _, _ = create_titles(admin_client)
+        # bulk_create skips the signals keeping the counters
+        Review.objects.bulk_create([Review(
+            title_id=titles[0]['id'], author=admin, text='Текст', score=7)])
+        review = Review.objects.get(author=admin)
+        url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=review.pk)
+        response = admin_client.delete(url)
+        assert response.status_code == HTTPStatus.NO_CONTENT, (
+            'Проверьте, что отзыв удаляется, даже если счётчики рейтинга '
+            'произведения разошлись с отзывами.'
+        )
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (0, 0)
@@ -2,8 +2,10 @@ from http import HTTPStatus
 
 import pytest
 
-from tests.utils import (check_fields, check_pagination, create_comments,
-                         create_reviews, create_single_comment)
+from api.v1.pagination import PubDateCursorPagination
+from tests.utils import (check_cursor_pagination, check_fields,
+                         check_pagination, create_comments, create_reviews,
+                         create_single_comment)
 
 
 @pytest.mark.django_db(transaction=True)
@@ -366,3 +368,20 @@ class Test06CommentAPI:
             f'Проверьте, что PUT-запрос к `{self.COMMENT_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_08_comments_cursor_pagination(self, client, admin_client,
+                                           admin, user_client, user,
+                                           moderator_client, moderator,
+                                           monkeypatch):
+        monkeypatch.setattr(PubDateCursorPagination, 'page_size', 2)
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id'])
+        pages = check_cursor_pagination(
+            client, url, [comment['id'] for comment in reversed(comments)])
+        assert pages == 2
@@ -0,0 +1,416 @@
+import re
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from api.v1.authentication import CustomUserRefreshToken
+from reviews.models import Category, Genre, Title
+from reviews.versions import bump_version
+from users.cache import user_cache
+from users.tokens import make_confirmation_code
+
+TABLE_RE = re.compile(r'"(\w+)"')
+
+
+def user_queries(context):
+    return [
+        query for query in context.captured_queries
+        if 'users_customuser' in query['sql']
+    ]
+
+
+def statements(context):
+    """(statement, first table) of every query."""
+    result = []
+    for query in context.captured_queries:
+        tables = TABLE_RE.findall(query['sql'])
+        result.append((query['sql'].split()[0], tables[0] if tables else None))
+    return result
+
+
+def content_queries(context):
+    """Queries of reviews tables, except the scope version lookup."""
+    return [
+        query for query in context.captured_queries
+        if 'reviews_' in query['sql']
+        and 'reviews_scopeversion' not in query['sql']
+    ]
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает ответ со статусом '
+        '200.'
+    )
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08QueryCount:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_titles_list_queries_do_not_depend_on_page_size(self, client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        genres = [
+            Genre.objects.create(name='Ужасы', slug='horror'),
+            Genre.objects.create(name='Комедия', slug='comedy'),
+        ]
+        for idx in range(100):
+            title = Title.objects.create(
+                name=f'Title {idx}', year=2000, category=category
+            )
+            title.genre.set(genres)
+
+        small_page = count_queries(client, f'{self.TITLES_URL}?limit=10')
+        large_page = count_queries(client, f'{self.TITLES_URL}?limit=100')
+        assert small_page == large_page, (
+            f'Проверьте, что количество запросов к БД при GET-запросе к '
+            f'`{self.TITLES_URL}` не зависит от размера страницы.'
+        )
+
+    def test_02_reviews_and_comments_queries_do_not_depend_on_rows(
+            self, client, django_user_model
+    ):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'author_{idx}', email=f'author_{idx}@yamdb.fake'
+            )
+            for idx in range(10)
+        ]
+        review = title.reviews.create(
+            author=authors[0], text='review', score=5
+        )
+        review.comments.create(author=authors[0], text='comment')
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        single_review = count_queries(client, reviews_url)
+        single_comment = count_queries(client, comments_url)
+
+        for author in authors[1:]:
+            title.reviews.create(author=author, text='review', score=5)
+            review.comments.create(author=author, text='comment')
+        assert count_queries(client, reviews_url) == single_review, (
+            'Проверьте, что количество запросов к БД при GET-запросе к '
+            '`/api/v1/titles/{title_id}/reviews/` не зависит от количества '
+            'отзывов на странице.'
+        )
+        assert count_queries(client, comments_url) == single_comment, (
+            'Проверьте, что количество запросов к БД при GET-запросе к '
+            '`/api/v1/titles/{title_id}/reviews/{review_id}/comments/` не '
+            'зависит от количества комментариев на странице.'
+        )
+
+    def test_03_signup_queries(self, client, django_user_model):
+        signup_url = '/api/v1/auth/signup/'
+        data = {'email': 'new_user@yamdb.fake', 'username': 'new_user'}
+        # The first bump of a scope also inserts its row
+        bump_version('users')
+        # Every query is counted. Tests deliver mail eagerly, so the
+        # last four are the delivery, run by a worker thread otherwise
+        delivery = [
+            ('UPDATE', 'users_outboxemail'),
+            ('SELECT', 'users_outboxemail'),
+            ('BEGIN', None),
+            ('UPDATE', 'users_outboxemail'),
+        ]
+        with CaptureQueriesContext(connection) as new_user_context:
+            response = client.post(signup_url, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert statements(new_user_context) == [
+            ('SELECT', 'users_customuser'),
+            ('INSERT', 'users_customuser'),
+            ('UPDATE', 'reviews_scopeversion'),
+            ('INSERT', 'users_outboxemail'),
+            *delivery,
+        ], (
+            f'Проверьте, что регистрация нового пользователя через '
+            f'`{signup_url}` выполняет один запрос на поиск пользователя, '
+            'его создание, сброс версии кеша пользователей и запись письма '
+            'в очередь.'
+        )
+
+        with CaptureQueriesContext(connection) as existing_user_context:
+            response = client.post(signup_url, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert statements(existing_user_context) == [
+            ('SELECT', 'users_customuser'),
+            ('INSERT', 'users_outboxemail'),
+            *delivery,
+        ], (
+            f'Проверьте, что повторный запрос кода подтверждения через '
+            f'`{signup_url}` не изменяет пользователя в БД и только '
+            'записывает письмо в очередь.'
+        )
+        assert django_user_model.objects.filter(
+            username=data['username']).count() == 1
+
+    def test_04_cached_category_and_genre_lists(self, admin_client):
+        for url, data in (
+                ('/api/v1/categories/', {'name': 'Фильм', 'slug': 'films'}),
+                ('/api/v1/genres/', {'name': 'Ужасы', 'slug': 'horror'}),
+        ):
+            count_queries(admin_client, url)
+            count_queries(admin_client, f'{url}?search=Фи')
+            with CaptureQueriesContext(connection) as context:
+                admin_client.get(url)
+            assert not content_queries(context), (
+                f'Проверьте, что повторный GET-запрос к `{url}` '
+                'отдаётся из кеша без запросов к базе данных.'
+            )
+            response = admin_client.post(url, data=data)
+            assert response.status_code == HTTPStatus.CREATED
+            response = admin_client.get(url)
+            assert response.json()['count'] == 1, (
+                f'Проверьте, что после создания объекта кеш `{url}` '
+                'сбрасывается.'
+            )
+            admin_client.delete(f'{url}{data["slug"]}/')
+            response = admin_client.get(f'{url}?search=Фи')
+            assert response.json()['count'] == 0, (
+                f'Проверьте, что после удаления объекта кеш `{url}` '
+                'с параметром `search` сбрасывается.'
+            )
+
+    def test_05_cached_title_detail(self, admin_client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        genre = Genre.objects.create(name='Ужасы', slug='horror')
+        title = Title.objects.create(name='Title', year=2000,
+                                     category=category)
+        url = f'{self.TITLES_URL}{title.id}/'
+        admin_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            admin_client.get(url)
+        assert not content_queries(context), (
+            f'Проверьте, что повторный GET-запрос к `{url}` '
+            'отдаётся из кеша без запросов к базе данных.'
+        )
+
+        title.genre.add(genre)
+        assert admin_client.get(url).json()['genre'] == [
+            {'name': 'Ужасы', 'slug': 'horror'}]
+        category.name = 'Кино'
+        category.save()
+        assert admin_client.get(url).json()['category']['name'] == 'Кино'
+        admin_client.post(f'{url}reviews/', data={'text': 'Текст', 'score': 8})
+        assert admin_client.get(url).json()['rating'] == 8, (
+            f'Проверьте, что кеш `{url}` сбрасывается после добавления '
+            'отзыва.'
+        )
+        genre.delete()
+        assert admin_client.get(url).json()['genre'] == []
+
+        padded_url = f'{self.TITLES_URL}0{title.id}/'
+        assert admin_client.get(padded_url).json()['name'] == 'Title'
+        title.name = 'Renamed'
+        title.save()
+        assert admin_client.get(padded_url).json()['name'] == 'Renamed', (
+            f'Проверьте, что кеш `{padded_url}` хранится по числовому `id` '
+            'произведения и сбрасывается при его изменении.'
+        )
+
+    def test_06_conditional_get(self, admin_client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Title', year=2000,
+                                     category=category)
+        reviews_url = f'{self.TITLES_URL}{title.id}/reviews/'
+        for url in (self.TITLES_URL, f'{self.TITLES_URL}{title.id}/',
+                    reviews_url):
+            response = admin_client.get(url)
+            etag = response.get('ETag')
+            assert etag and response.get('Last-Modified'), (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+                'заголовки `ETag` и `Last-Modified`.'
+            )
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                f'Проверьте, что GET-запрос к `{url}` с неизменившимся '
+                '`ETag` возвращает ответ со статусом 304.'
+            )
+            assert not content_queries(context)
+
+        etag = admin_client.get(reviews_url)['ETag']
+        admin_client.post(reviews_url, data={'text': 'Текст', 'score': 8})
+        response = admin_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после добавления отзыва GET-запрос к '
+            f'`{reviews_url}` со старым `ETag` возвращает ответ со '
+            'статусом 200.'
+        )
+
+    def test_07_stateless_jwt_read_requests(self, admin):
+        token = CustomUserRefreshToken.for_user(admin).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert not user_queries(context), (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с токеном, '
+            'содержащим роль пользователя, не загружает пользователя из БД.'
+        )
+
+        response = client.post(
+            '/api/v1/categories/', data={'name': 'Фильм', 'slug': 'films'})
+        assert response.status_code == HTTPStatus.CREATED
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['username'] == admin.username
+
+    def test_08_cached_users_on_write_requests(self, admin_client, admin,
+                                               user, user_client):
+        url = '/api/v1/categories/'
+        admin_client.post(url, data={'name': 'Фильм', 'slug': 'films'})
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                url, data={'name': 'Книга', 'slug': 'books'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert not user_queries(context), (
+            'Проверьте, что при повторном запросе на запись пользователь '
+            'берётся из кеша, а не из БД.'
+        )
+        assert user_cache.stats()['hits'] >= 1
+
+        data = {'name': 'Ужасы', 'slug': 'horror'}
+        response = user_client.post('/api/v1/genres/', data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        admin_client.patch(f'/api/v1/users/{user.username}/',
+                           data={'role': 'admin'})
+        response = user_client.post('/api/v1/genres/', data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что изменение пользователя через `/api/v1/users/` '
+            'сбрасывает его копию в кеше.'
+        )
+
+    def test_09_token_queries(self, client, user, settings):
+        url = '/api/v1/auth/token/'
+        code = make_confirmation_code(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data={
+                'username': user.username, 'confirmation_code': code})
+        assert response.status_code == HTTPStatus.OK
+        assert 'access_token' in response.json()
+        assert len(context.captured_queries) == 1, (
+            f'Проверьте, что выдача токена через `{url}` выполняет '
+            'один запрос к БД.'
+        )
+
+        settings.CONFIRMATION_CODE_TIMEOUT = -1
+        response = client.post(url, data={
+            'username': user.username, 'confirmation_code': code})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что `{url}` отклоняет просроченный код '
+            'подтверждения.'
+        )
+
+    def test_10_etag_versions_are_shared(self, admin_client, csv_data_dir):
+        response = admin_client.get(self.TITLES_URL)
+        etag = response['ETag']
+        # Another process has its own local cache
+        cache.clear()
+        response = admin_client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что версии для `ETag` хранятся в БД, а не в '
+            'локальном кеше процесса.'
+        )
+
+        call_command('import_from_csv', data_dir=str(csv_data_dir),
+                     stdout=StringIO())
+        response = admin_client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после `import_from_csv` старый `ETag` '
+            'перестаёт совпадать.'
+        )
+        assert response.json()['count'] == 3
+
+    def test_11_cached_user_dropped_on_model_save(self, admin_client, admin):
+        url = '/api/v1/users/'
+        assert admin_client.get(url).status_code == HTTPStatus.OK
+        admin.role = 'user'
+        admin.save()
+        assert admin_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что пользователь удаляется из кеша при любом '
+            'сохранении модели, например через админку.'
+        )
+
+    def test_12_reviews_etag_follows_title_name(self, admin_client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Title', year=2000,
+                                     category=category)
+        reviews_url = f'{self.TITLES_URL}{title.id}/reviews/'
+        admin_client.post(reviews_url, data={'text': 'Текст', 'score': 8})
+        etag = admin_client.get(reviews_url)['ETag']
+        response = admin_client.patch(
+            f'{self.TITLES_URL}{title.id}/', data={'name': 'Renamed'})
+        assert response.status_code == HTTPStatus.OK
+        response = admin_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после переименования произведения GET-запрос '
+            f'к `{reviews_url}` со старым `ETag` возвращает ответ со '
+            'статусом 200.'
+        )
+        assert response.json()['results'][0]['title'] == 'Renamed'
+
+    def test_13_reviews_etag_ignores_new_users(self, client, admin_client,
+                                               admin):
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Title', year=2000,
+                                     category=category)
+        reviews_url = f'{self.TITLES_URL}{title.id}/reviews/'
+        admin_client.post(reviews_url, data={'text': 'Текст', 'score': 8})
+        etag = admin_client.get(reviews_url)['ETag']
+        users_etag = admin_client.get('/api/v1/users/')['ETag']
+        response = client.post('/api/v1/auth/signup/', data={
+            'email': 'new_user@yamdb.fake', 'username': 'new_user'})
+        assert response.status_code == HTTPStatus.OK
+        response = admin_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что регистрация нового пользователя не сбрасывает '
+            f'`ETag` списка `{reviews_url}`.'
+        )
+        response = admin_client.get(
+            '/api/v1/users/', HTTP_IF_NONE_MATCH=users_etag)
+        assert response.status_code == HTTPStatus.OK
+
+        admin.username = 'renamed_admin'
+        admin.save()
+        response = admin_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после смены имени автора GET-запрос к '
+            f'`{reviews_url}` со старым `ETag` возвращает ответ со '
+            'статусом 200.'
+        )
+        assert response.json()['results'][0]['author'] == 'renamed_admin'
+
+    def test_14_versions_from_shared_cache(self, admin_client, settings):
+        settings.VERSIONS_CACHE_ALIAS = 'default'
+        url = '/api/v1/categories/'
+        admin_client.get(url)
+        admin_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert not context.captured_queries, (
+            f'Проверьте, что с `VERSIONS_CACHE_ALIAS` повторный GET-запрос '
+            f'к `{url}` не выполняет запросов к БД, даже за версиями.'
+        )
+        response = admin_client.post(
+            url, data={'name': 'Фильм', 'slug': 'films'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert admin_client.get(url).json()['count'] == 1, (
+            'Проверьте, что изменение данных обновляет версию в кеше.'
+        )
+        cache.delete('scope-version:categories')
+        assert admin_client.get(url).json()['count'] == 1, (
+            'Проверьте, что версии, которых нет в кеше, читаются из БД.'
+        )
@@ -0,0 +1,113 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.v1.throttling import (IPRateThrottle, LocMemCounterStore,
+                               UsernameRateThrottle)
+
+# Mean cost of one throttle check, in microseconds
+THROTTLE_BUDGET_US = 50
+
+
+@pytest.fixture
+def auth_rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'auth_ip': '5/minute',
+            'auth_username': '2/minute',
+        },
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09Throttling:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+
+    @pytest.mark.usefixtures('auth_rates')
+    def test_01_username_throttle(self, client):
+        data = {'username': 'bot', 'confirmation_code': 'code'}
+        for _ in range(2):
+            response = client.post(self.URL_TOKEN, data=data)
+            assert response.status_code != HTTPStatus.TOO_MANY_REQUESTS
+        response = client.post(self.URL_TOKEN, data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что `{self.URL_TOKEN}` ограничивает число '
+            'запросов для одного `username`.'
+        )
+        assert response.get('Retry-After')
+        response = client.post(
+            self.URL_TOKEN, data={**data, 'username': 'Other'})
+        assert response.status_code != HTTPStatus.TOO_MANY_REQUESTS
+
+    @pytest.mark.usefixtures('auth_rates')
+    def test_02_ip_throttle(self, client):
+        for idx in range(5):
+            response = client.post(self.URL_SIGNUP, data={
+                'username': f'user_{idx}',
+                'email': f'user_{idx}@yamdb.fake',
+            })
+            assert response.status_code == HTTPStatus.OK
+        response = client.post(self.URL_SIGNUP, data={
+            'username': 'user_5', 'email': 'user_5@yamdb.fake'})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что `{self.URL_SIGNUP}` ограничивает число '
+            'запросов с одного IP-адреса.'
+        )
+
+    def test_03_sliding_window(self):
+        store = LocMemCounterStore()
+        assert not store.hit('key', 2, 60, 600)
+        assert not store.hit('key', 2, 60, 610)
+        assert store.hit('key', 2, 60, 620)
+        # 15 seconds into the next window 3/4 of the previous hits count
+        assert not store.hit('key', 2, 60, 675)
+        assert store.hit('key', 2, 60, 676)
+        # 45 seconds into it only 1/4 of them do
+        assert not store.hit('key', 2, 60, 705)
+
+    def test_04_flood_of_new_keys(self):
+        store = LocMemCounterStore()
+        store.max_keys = 1000
+        for idx in range(5000):
+            assert not store.hit(f'bot_{idx}', 2, 60, 600 + idx / 1000)
+        assert store.size == 1000 == sum(map(len, store.buckets.values())), (
+            'Проверьте, что число счётчиков ограничено `max_keys`.'
+        )
+        for _ in range(2):
+            store.hit('victim', 2, 60, 610)
+        assert store.hit('victim', 2, 60, 611), (
+            'Проверьте, что после потока новых ключей недавние счётчики '
+            'продолжают ограничивать запросы.'
+        )
+        assert not store.hit('bot_0', 2, 60, 745)
+        assert store.size == 1 and len(store.buckets) == 1, (
+            'Проверьте, что счётчики устаревших окон удаляются целиком.'
+        )
+
+    @pytest.mark.benchmark
+    def test_05_throttle_overhead(self):
+        request = APIRequestFactory().post(
+            self.URL_TOKEN, {'username': 'budget'}, format='json')
+        request = Request(request, parsers=[JSONParser()])
+        throttles = (IPRateThrottle(), UsernameRateThrottle())
+        rounds = 2000
+        timings = []
+        # The best of several runs filters out a busy machine
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for throttle in throttles:
+                    throttle.allow_request(request, None)
+            timings.append(time.perf_counter() - started)
+        spent = min(timings) / rounds / len(throttles)
+        assert spent * 1e6 < THROTTLE_BUDGET_US, (
+            f'Проверка ограничения запросов занимает {spent * 1e6:.1f} мкс, '
+            f'больше {THROTTLE_BUDGET_US} мкс.'
+        )
@@ -0,0 +1,336 @@
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews import importing
+from reviews.importing import (INSERT, ImportResult, import_stage,
+                               import_stages, load_specs, read_rows)
+from reviews.models import (Category, Comment, Genre, Review, ScopeVersion,
+                            Title, TitleGenre)
+from users.models import CustomUser
+
+from tests.fixtures.fixture_data import CSV_DATA, write_csv
+
+
+def snapshot():
+    return {
+        model.__name__: list(model.objects.order_by('pk').values())
+        for model in (Category, Genre, Title, Review, Comment)
+    }
+
+
+def import_csv(*args, **options):
+    out = StringIO()
+    call_command('import_from_csv', *args, stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+class Test10Import:
+
+    def test_01_pub_dates_are_imported(self, csv_data_dir):
+        import_csv(data_dir=str(csv_data_dir))
+        assert Review.objects.get(pk=1).pub_date == datetime(
+            2019, 9, 24, 21, 8, 21, 567000, tzinfo=timezone.utc), (
+            'Проверьте, что при импорте `pub_date` отзывов берётся из '
+            'файла, а не заменяется текущим временем.'
+        )
+        assert Comment.objects.get(pk=2).pub_date == datetime(
+            2019, 9, 27, 8, tzinfo=timezone.utc)
+        assert Review._meta.get_field('pub_date').auto_now_add
+
+    def test_02_changed_pub_date_is_upserted(self, csv_data_dir):
+        import_csv(data_dir=str(csv_data_dir))
+        review_csv = csv_data_dir / 'review.csv'
+        review_csv.write_text(
+            review_csv.read_text(encoding='utf-8').replace(
+                '2019-09-24T21:08:21.567Z', '2018-01-01T00:00:00.000Z'),
+            encoding='utf-8')
+        output = import_csv(data_dir=str(csv_data_dir), mode='upsert')
+        assert 'review: 3 rows read, 1 written' in output
+        assert Review.objects.get(pk=1).pub_date == datetime(
+            2018, 1, 1, tzinfo=timezone.utc), (
+            'Проверьте, что импорт с `--upsert` обновляет изменённую '
+            '`pub_date`.'
+        )
+
+    def test_03_rows_are_inserted_in_batches(self, csv_data_dir):
+        output = import_csv(data_dir=str(csv_data_dir), batch_size=2)
+        for name, rows in CSV_DATA.items():
+            count = len(rows) - 1
+            assert f'{name}: {count} rows read, {count} written' in output, (
+                f'Проверьте, что при импорте `{name}.csv` частями '
+                'записываются все строки.'
+            )
+        assert (Category.objects.count(), Genre.objects.count(),
+                Title.objects.count(), TitleGenre.objects.count(),
+                CustomUser.objects.count(), Review.objects.count(),
+                Comment.objects.count()) == (2, 2, 3, 3, 2, 3, 2)
+        title = Title.objects.get(pk=1)
+        other_title = Title.objects.get(pk=2)
+        assert (title.rating_sum, title.rating_count) == (14, 2), (
+            'Проверьте, что после импорта рейтинги произведений '
+            'пересчитываются.'
+        )
+        review = Review.objects.create(
+            title=other_title, author=CustomUser.objects.get(pk=101),
+            text='Ещё отзыв', score=5)
+        assert review.pk > 3, (
+            'Проверьте, что после импорта последовательности первичных '
+            'ключей сдвигаются за импортированные `id`.'
+        )
+
+    def test_04_upsert_writes_new_and_changed_rows(self, csv_data_dir):
+        import_csv(data_dir=str(csv_data_dir))
+        unchanged = Review.objects.filter(pk__lte=2).values()
+        before = list(unchanged)
+        review_csv = csv_data_dir / 'review.csv'
+        with open(review_csv, 'a', encoding='utf-8', newline='') as stream:
+            stream.write('4,3,Новый отзыв,101,7,2020-02-01T00:00:00.000Z\r\n')
+        review_csv.write_text(
+            review_csv.read_text(encoding='utf-8').replace(
+                'Классика', 'Вечная классика'),
+            encoding='utf-8')
+
+        output = import_csv(data_dir=str(csv_data_dir), mode='upsert')
+        assert 'review: 4 rows read, 2 written' in output, (
+            'Проверьте, что импорт с `--upsert` записывает только новые '
+            'и изменённые строки.'
+        )
+        assert 'comments: 2 rows read, 0 written' in output
+        assert Review.objects.count() == 4
+        assert Review.objects.get(pk=3).text == 'Вечная классика'
+        assert list(unchanged) == before
+        title = Title.objects.get(pk=3)
+        assert (title.rating_sum, title.rating_count) == (7, 1)
+
+    def test_05_insert_of_existing_rows_fails(self, csv_data_dir):
+        import_csv(data_dir=str(csv_data_dir))
+        with pytest.raises(IntegrityError):
+            import_csv(source=[f'category={csv_data_dir / "category.csv"}'])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_10_export_import_round_trip(csv_data_dir, tmp_path):
+    import_csv(data_dir=str(csv_data_dir))
+    before = snapshot()
+    export_dir = tmp_path / 'export'
+    call_command('export_to_csv', output_dir=str(export_dir), gzip=True,
+                 stdout=StringIO())
+    for model in (Comment, Review, TitleGenre, Title, Genre, Category,
+                  CustomUser):
+        model.objects.all().delete()
+
+    import_csv(data_dir=str(export_dir))
+    assert snapshot() == before, (
+        'Проверьте, что данные, выгруженные `export_to_csv`, '
+        'восстанавливаются `import_from_csv` без изменений, '
+        'включая `pub_date`.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_11_stage_import_in_chunks(csv_data_dir):
+    specs = {spec.name: spec for spec in load_specs()}
+    stages = import_stages(list(specs.values()))
+    assert [sorted(spec.name for spec in stage) for stage in stages] == [
+        ['category', 'genre', 'users'],
+        ['titles'],
+        ['genre_title', 'review'],
+        ['comments'],
+    ], 'Проверьте, что файлы делятся на этапы по внешним ключам.'
+
+    stage = [specs['category'], specs['genre']]
+    rows_by_name = {
+        name: read_rows(str(csv_data_dir / f'{name}.csv'))
+        for name in ('category', 'genre')
+    }
+    with ThreadPoolExecutor(1) as pool:
+        finished = {
+            name: result for name, result, _ in import_stage(
+                pool, stage, rows_by_name, batch_size=1, workers=1,
+                chunk_size=1, mode=INSERT)
+        }
+    assert finished == {
+        'category': ImportResult(2, 2),
+        'genre': ImportResult(2, 2),
+    }, 'Проверьте, что результаты всех частей файла суммируются.'
+    assert Category.objects.count() == Genre.objects.count() == 2
+
+
+@pytest.mark.django_db
+class Test10IncrementalImport:
+
+    def test_01_incremental_skips_unchanged_rows(self, csv_data_dir):
+        output = import_csv(data_dir=str(csv_data_dir), mode='incremental')
+        assert 'comments: 2 rows read, 2 written' in output
+        versions = ScopeVersion.objects.order_by('scope').values_list(
+            'scope', 'version')
+        before = list(versions)
+        with CaptureQueriesContext(connection) as context:
+            output = import_csv(
+                data_dir=str(csv_data_dir), mode='incremental')
+        assert 'review: 3 rows read, 0 written' in output, (
+            'Проверьте, что `--incremental` не записывает строки '
+            'с неизменённым хешем.'
+        )
+        assert 'Rebuilt' not in output and not [
+            query for query in context.captured_queries
+            if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))
+        ], (
+            'Проверьте, что импорт без изменений не пересчитывает рейтинги, '
+            'поисковый индекс и версии кеша.'
+        )
+        assert list(versions) == before
+        comments_csv = csv_data_dir / 'comments.csv'
+        comments_csv.write_text(
+            comments_csv.read_text(encoding='utf-8').replace(
+                'Согласен', 'Полностью согласен', 1),
+            encoding='utf-8')
+        output = import_csv(data_dir=str(csv_data_dir), mode='incremental')
+        assert 'comments: 2 rows read, 1 written' in output
+        assert 'Rebuilt' not in output, (
+            'Проверьте, что рейтинги и поисковый индекс пересчитываются, '
+            'только если записаны отзывы или произведения.'
+        )
+        assert Comment.objects.get(pk=1).text == 'Полностью согласен'
+
+    def test_02_append_only_resumes_after_checkpoint(self, csv_data_dir):
+        import_csv(data_dir=str(csv_data_dir), append_only=['comments'])
+        comments_csv = csv_data_dir / 'comments.csv'
+        with open(comments_csv, 'a', encoding='utf-8', newline='') as stream:
+            stream.write('3,3,Новый,101,2020-02-01T00:00:00.000Z\r\n')
+        output = import_csv(
+            source=[f'comments={comments_csv}'], append_only=['comments'])
+        assert 'comments: 1 rows read, 1 written' in output, (
+            'Проверьте, что `--append-only` читает только новые строки.'
+        )
+        assert Comment.objects.count() == 3
+
+        comments_csv.write_text(
+            comments_csv.read_text(encoding='utf-8').replace(
+                '3,3,Новый', '7,3,Новый'),
+            encoding='utf-8')
+        with pytest.raises(CommandError, match='not append-only'):
+            import_csv(
+                source=[f'comments={comments_csv}'], append_only=['comments'])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_12_parallel_import(csv_data_dir, monkeypatch):
+    # Worker processes cannot see the in-memory test database and
+    # SQLite locks its tables against concurrent writing threads
+    monkeypatch.setattr(
+        importing, 'ProcessPoolExecutor',
+        lambda workers, initializer: ThreadPoolExecutor(
+            1, initializer=initializer))
+    sources = [
+        (spec, read_rows(str(csv_data_dir / f'{spec.name}.csv')))
+        for spec in load_specs()
+    ]
+    results = {
+        name: result for name, result, _ in importing.import_files(
+            sources, batch_size=2, workers=2, chunk_size=1)
+    }
+    assert results == {
+        name: ImportResult(len(rows) - 1, len(rows) - 1)
+        for name, rows in CSV_DATA.items()
+    }, (
+        'Проверьте, что файлы полностью импортируются несколькими '
+        'обработчиками.'
+    )
+    assert Comment.objects.filter(review__title_id=1).count() == 2
+
+    with pytest.raises(CommandError, match='SQLite'):
+        import_csv(data_dir=str(csv_data_dir), workers=2)
+
+
+@pytest.mark.django_db
+class Test10ImportSources:
+
+    def test_01_gzip_files(self, csv_data_dir):
+        for path in list(csv_data_dir.iterdir()):
+            with gzip.open(f'{path}.gz', 'wb') as stream:
+                stream.write(path.read_bytes())
+            path.unlink()
+        output = import_csv(data_dir=str(csv_data_dir))
+        assert 'review: 3 rows read, 3 written' in output, (
+            'Проверьте, что файлы `FILE.csv.gz` читаются из `--data-dir`.'
+        )
+        assert Comment.objects.count() == 2
+
+    def test_02_stdin_and_jsonl(self, csv_data_dir, monkeypatch):
+        monkeypatch.setattr(
+            'sys.stdin', StringIO('id,name,slug\n1,Фильм,movie\n'))
+        genre_jsonl = csv_data_dir / 'genre.jsonl'
+        genre_jsonl.write_text(
+            '{"id": 1, "name": "Драма", "slug": "drama"}\n\n'
+            '{"id": 2, "name": "Комедия", "slug": "comedy"}\n',
+            encoding='utf-8')
+        output = import_csv(
+            source=['category=-', f'genre={genre_jsonl}'])
+        assert 'category: 1 rows read, 1 written' in output, (
+            'Проверьте, что `--source FILE=-` читает данные из stdin.'
+        )
+        assert 'genre: 2 rows read, 2 written' in output, (
+            'Проверьте, что файлы `*.jsonl` читаются построчно как JSON.'
+        )
+        assert Category.objects.get(pk=1).slug == 'movie'
+        assert list(Genre.objects.values_list('slug', flat=True)
+                    .order_by('pk')) == ['drama', 'comedy']
+
+    def test_03_jsonl_lines_without_optional_keys(self, csv_data_dir):
+        import_csv(data_dir=str(csv_data_dir))
+        titles_jsonl = csv_data_dir / 'titles.jsonl'
+        titles_jsonl.write_text(
+            '{"id": 1, "name": "Побег", "year": 1994, "category": 1, '
+            '"description": "Тюремная драма"}\n'
+            '{"id": 2, "name": "Крестный отец", "year": 1972, '
+            '"category": 1}\n',
+            encoding='utf-8')
+        output = import_csv(
+            source=[f'titles={titles_jsonl}'], mode='upsert')
+        assert 'titles: 2 rows read, 1 written' in output
+        assert list(Title.objects.filter(pk__in=(1, 2)).order_by('pk')
+                    .values_list('name', 'description')) == [
+            ('Побег', 'Тюремная драма'),
+            ('Крестный отец', None),
+        ], (
+            'Проверьте, что ключи, пропущенные в отдельных строках JSONL, '
+            'импортируются как пустые значения.'
+        )
+
+    def test_04_column_mapping(self, csv_data_dir, tmp_path):
+        write_csv(csv_data_dir / 'category.csv', (
+            ('code', 'title', 'key'),
+            ('movie', 'Фильм', 1),
+        ))
+        mapping = tmp_path / 'mapping.json'
+        mapping.write_text(json.dumps({
+            'category': {'key': 'id', 'title': 'name', 'code': 'slug'},
+        }), encoding='utf-8')
+        import_csv(
+            source=[f'category={csv_data_dir / "category.csv"}'],
+            mapping=str(mapping))
+        assert Category.objects.filter(
+            pk=1, name='Фильм', slug='movie').exists(), (
+            'Проверьте, что `--mapping` задаёт соответствие столбцов '
+            'полям модели.'
+        )
+
+    @pytest.mark.parametrize('options', (
+        {'source': ['unknown=file.csv']},
+        {'source': ['category']},
+        {'source': ['category=-', 'genre=-']},
+        {'mapping': 'missing.json'},
+    ))
+    def test_05_invalid_sources(self, options):
+        with pytest.raises(CommandError):
+            import_csv(**options)
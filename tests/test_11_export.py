@@ -0,0 +1,110 @@
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from reviews import exporting
+from reviews.management.commands import export_to_csv
+from tests.fixtures.fixture_data import CSV_DATA
+
+
+def import_data(data_dir):
+    call_command('import_from_csv', data_dir=str(data_dir), stdout=StringIO())
+
+
+def content(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+@pytest.mark.django_db
+class Test11ExportAPI:
+
+    URL_EXPORT = '/api/v1/export/{}/'
+
+    def test_01_csv_export(self, admin_client, csv_data_dir):
+        import_data(csv_data_dir)
+        response = admin_client.get(self.URL_EXPORT.format('reviews'))
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что `{self.URL_EXPORT.format("reviews")}` '
+            'доступен администратору.'
+        )
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        assert 'reviews.csv' in response['Content-Disposition']
+        rows = list(csv.DictReader(StringIO(content(response))))
+        assert [row['id'] for row in rows] == ['1', '2', '3'], (
+            'Проверьте, что выгрузка содержит все отзывы по порядку.'
+        )
+        assert rows[0] == {
+            'id': '1',
+            'title_id': '1',
+            'text': 'Ставлю десять звёзд!',
+            'author': '100',
+            'score': '10',
+            'pub_date': '2019-09-24T21:08:21.567000+00:00',
+        }, 'Проверьте, что столбцы выгрузки совпадают со столбцами импорта.'
+
+    def test_02_ndjson_export(self, admin_client, csv_data_dir):
+        import_data(csv_data_dir)
+        response = admin_client.get(
+            self.URL_EXPORT.format('comments'), {'format': 'ndjson'})
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = [json.loads(line) for line in content(response).splitlines()]
+        assert [row['text'] for row in rows] == ['Согласен', 'Не согласен'], (
+            'Проверьте, что `?format=ndjson` выгружает JSON-объект '
+            'в каждой строке.'
+        )
+
+    def test_03_export_is_admin_only(self, client, user_client,
+                                     moderator_client):
+        url = self.URL_EXPORT.format('titles')
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что `{url}` недоступен анонимному пользователю.'
+        )
+        for api_client in (user_client, moderator_client):
+            assert api_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+                f'Проверьте, что `{url}` доступен только администратору.'
+            )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_11_export_command(csv_data_dir, tmp_path):
+    import_data(csv_data_dir)
+    export_dir = tmp_path / 'export'
+    out = StringIO()
+    call_command('export_to_csv', output_dir=str(export_dir), workers=2,
+                 chunk_size=1, stdout=out)
+    assert sorted(path.name for path in export_dir.iterdir()) == sorted(
+        f'{name}.csv' for name in CSV_DATA), (
+        'Проверьте, что `export_to_csv` выгружает все файлы импорта.'
+    )
+    for name in ('category', 'genre', 'genre_title'):
+        with open(export_dir / f'{name}.csv', encoding='utf-8',
+                  newline='') as stream:
+            exported = list(csv.reader(stream))
+        assert exported == [
+            [str(value) for value in row] for row in CSV_DATA[name]
+        ], f'Проверьте, что `{name}.csv` выгружается без изменений.'
+    assert 'review: 3 rows exported' in out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_12_export_reads_one_snapshot(csv_data_dir, tmp_path, monkeypatch):
+    import_data(csv_data_dir)
+    atomic = []
+
+    def export_rows(spec, chunk_size):
+        atomic.append(connection.in_atomic_block)
+        return exporting.export_rows(spec, chunk_size)
+
+    monkeypatch.setattr(export_to_csv, 'export_rows', export_rows)
+    call_command('export_to_csv', output_dir=str(tmp_path / 'export'),
+                 stdout=StringIO())
+    assert atomic == [True] * len(CSV_DATA), (
+        'Проверьте, что `export_to_csv` читает все файлы в одной '
+        'транзакции, чтобы выгрузка была согласованной.'
+    )
@@ -0,0 +1,173 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+
+import pytest
+from django.core.mail.backends.filebased import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from users import mail
+from users.mail import MailDispatcher, deliver
+from users.models import OutboxEmail
+
+
+class FailingEmailBackend(EmailBackend):
+    """File backend failing the first `failures` messages."""
+
+    failures = 0
+
+    def send_messages(self, email_messages):
+        if FailingEmailBackend.failures:
+            FailingEmailBackend.failures -= 1
+            raise SMTPException('Connection refused')
+        return super().send_messages(email_messages)
+
+
+class UnavailableEmailBackend(EmailBackend):
+
+    def open(self):
+        raise SMTPException('Connection timed out')
+
+
+def create_emails(count):
+    return [
+        OutboxEmail.objects.create(
+            subject=f'Code {idx}',
+            body='Confirmation code',
+            from_email='from@yamdb.fake',
+            recipients=f'user_{idx}@yamdb.fake',
+        ).pk
+        for idx in range(count)
+    ]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'Письма не доставлены вовремя.'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def file_mail(settings, tmp_path):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+    settings.EMAIL_FILE_PATH = str(tmp_path)
+    settings.MAILER = {**settings.MAILER, 'MAX_ATTEMPTS': 2}
+    FailingEmailBackend.failures = 0
+    return tmp_path
+
+
+def delivered_text(path):
+    return ''.join(item.read_text() for item in path.iterdir())
+
+
+@pytest.mark.django_db
+class Test12Mail:
+
+    def test_01_failed_delivery_is_retried(self, settings, file_mail):
+        settings.EMAIL_BACKEND = 'tests.test_12_mail.FailingEmailBackend'
+        FailingEmailBackend.failures = 1
+        pk, other_pk = create_emails(2)
+        assert deliver([pk, other_pk]) == [pk], (
+            'Проверьте, что `deliver` возвращает недоставленные письма '
+            'для повторной отправки.'
+        )
+        email = OutboxEmail.objects.get(pk=pk)
+        assert (email.sent, email.attempts) == (None, 1)
+        assert email.last_error == 'Connection refused'
+        assert OutboxEmail.objects.get(pk=other_pk).sent is not None
+
+        assert deliver([pk, other_pk]) == []
+        email.refresh_from_db()
+        assert email.sent is not None and email.attempts == 2
+        assert email.last_error == ''
+        assert OutboxEmail.objects.get(pk=other_pk).attempts == 1, (
+            'Проверьте, что отправленные письма не доставляются повторно.'
+        )
+
+    def test_02_attempts_are_limited(self, settings, file_mail):
+        settings.EMAIL_BACKEND = 'tests.test_12_mail.UnavailableEmailBackend'
+        pks = create_emails(2)
+        assert deliver(pks) == pks
+        assert deliver(pks) == [], (
+            'Проверьте, что после `MAX_ATTEMPTS` попыток письмо больше '
+            'не возвращается для повторной отправки.'
+        )
+        assert deliver(pks) == []
+        assert set(OutboxEmail.objects.values_list(
+            'attempts', 'last_error')) == {(2, 'Connection timed out')}
+        assert not list(file_mail.iterdir())
+
+    def test_03_send_queued_mail(self, file_mail):
+        create_emails(3)
+        out = StringIO()
+        call_command('send_queued_mail', stdout=out)
+        assert 'Processed 3 emails, 0 left for retry.' in out.getvalue()
+        assert not OutboxEmail.objects.filter(sent__isnull=True).exists()
+        assert all(
+            f'Code {idx}' in delivered_text(file_mail) for idx in range(3))
+
+    def test_04_claimed_emails_are_not_sent_twice(self, file_mail):
+        pk, other_pk = create_emails(2)
+        OutboxEmail.objects.filter(pk=pk).update(
+            claim='other-sender',
+            claimed_until=timezone.now() + timedelta(minutes=5))
+        assert deliver([pk, other_pk]) == []
+        assert OutboxEmail.objects.get(pk=pk).sent is None, (
+            'Проверьте, что письмо, которое отправляет другой обработчик, '
+            'не отправляется повторно.'
+        )
+        assert 'Code 0' not in delivered_text(file_mail)
+        assert deliver([other_pk]) == []
+        assert OutboxEmail.objects.get(pk=other_pk).attempts == 1
+
+        OutboxEmail.objects.filter(pk=pk).update(
+            claimed_until=timezone.now() - timedelta(seconds=1))
+        deliver([pk])
+        assert OutboxEmail.objects.get(pk=pk).sent is not None, (
+            'Проверьте, что письмо с истёкшей блокировкой отправляется.'
+        )
+
+    def test_05_one_retry_timer_per_batch(self, monkeypatch):
+        timers = []
+
+        class Timer:
+            def __init__(self, interval, function, args):
+                timers.append((function, args))
+
+            def start(self):
+                pass
+
+        monkeypatch.setattr(mail.threading, 'Timer', Timer)
+        dispatcher = MailDispatcher()
+        dispatcher.retry_later([])
+        dispatcher.retry_later([1, 2, 3])
+        assert len(timers) == 1, (
+            'Проверьте, что неудачная партия писем ставится в очередь '
+            'повторно одним таймером.'
+        )
+        function, args = timers[0]
+        function(*args)
+        assert [dispatcher.queue.get_nowait() for _ in range(3)] == [1, 2, 3]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_12_worker_delivers_queued_batch(settings, file_mail):
+    settings.EMAIL_BACKEND = 'tests.test_12_mail.FailingEmailBackend'
+    settings.MAILER = {
+        **settings.MAILER, 'ASYNC': True, 'WORKERS': 1, 'RETRY_DELAY': 0.05}
+    FailingEmailBackend.failures = 1
+    pks = create_emails(3)
+    dispatcher = MailDispatcher()
+    for pk in pks:
+        dispatcher.submit(pk)
+    wait_for(lambda: not OutboxEmail.objects.filter(
+        sent__isnull=True).exists())
+    assert sorted(OutboxEmail.objects.values_list('attempts', flat=True)) == [
+        1, 1, 2], (
+        'Проверьте, что фоновый обработчик отправляет письма из очереди '
+        'и повторяет неудачную отправку.'
+    )
+    assert all(f'Code {idx}' in delivered_text(file_mail) for idx in range(3))
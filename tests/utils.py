@@ -129,6 +129,35 @@ def check_pagination(url, respons_data, expected_count, post_data=None):
         )
 
 
+def check_cursor_pagination(client, url, expected_ids):
+    """Follow the `next` links from `?cursor=`, compare the ids seen."""
+    response = client.get(url, {'cursor': ''})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert 'count' not in data and data['previous'] is None, (
+        f'Проверьте, что запрос к `{url}?cursor=` возвращает первую '
+        'страницу без ключа `count`.'
+    )
+    seen = [obj['id'] for obj in data['results']]
+    pages = 1
+    while data['next']:
+        assert 'cursor=' in data['next']
+        response = client.get(data['next'])
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data['previous'], (
+            f'Проверьте, что страницы `{url}?cursor=` после первой '
+            'содержат ссылку `previous`.'
+        )
+        seen.extend(obj['id'] for obj in data['results'])
+        pages += 1
+    assert seen == expected_ids, (
+        f'Проверьте, что страницы `{url}?cursor=` по ссылкам `next` '
+        'содержат все объекты по одному разу, новые первыми.'
+    )
+    return pages
+
+
 def check_permissions(client, url, data, user_role, objects,
                       expected_status):
     sufix = 'slug' if 'slug' in objects[0] else 'id'